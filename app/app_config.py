@@ -0,0 +1,26 @@
+import os
+import sys
+from omegaconf import OmegaConf
+
+# Repository root, and src/ where the CLI scripts run (paths in the config are relative to it)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, 'src')
+
+# The engine modules (scoring, scene detection, clip export, ...) are shared with the CLI
+# scripts and live in src/ only. Appended, so the app's own modules win on name clashes.
+if SRC_DIR not in sys.path:
+    sys.path.append(SRC_DIR)
+
+config = OmegaConf.load(os.path.join(ROOT_DIR, 'config', 'base_config.yaml'))
+
+def resolve_path(path):
+    """
+    Absolute path of a path from the config.
+
+    Args:
+        path (str): Path relative to src/, as written in the config.
+
+    Returns:
+        str: Absolute path.
+    """
+    return os.path.normpath(os.path.join(SRC_DIR, path))
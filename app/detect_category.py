@@ -3,77 +3,193 @@ import cv2
 import numpy as np
 import os
 import tempfile
-import tensorflow as tf
-from tensorflow.keras.preprocessing import image
-from tensorflow.keras.applications.inception_v3 import InceptionV3, preprocess_input, decode_predictions
-
-# Load InceptionV3 model pre-trained on ImageNet data
-model = InceptionV3(weights='imagenet')
-
-# Map ImageNet class indices to human-readable labels
-imagenet_labels = {
-    'n02342885': 'Animal',
-    'n03814639': 'Beauty',
-    'n04118538': 'Sports',
-    'n07697537': 'Food'
-}
+import threading
+from collections import Counter
+
+import app_config  # Puts the shared engine modules of src/ on the import path
+from classifier_backends import BACKENDS, INPUT_SIZE, load_backend, predict_batches, top_categories
+from frame_sampler import read_frames, sample_indices, stratified_indices
+from model_registry import registry
 
+MODEL_NAME = "inception_v3"
+
+# Models exported by src/export_classifier.py (same config keys), served without TensorFlow when present
+MODEL_PATHS = {
+    "tflite": app_config.resolve_path(app_config.config.category.tflite_path),
+    "onnx": app_config.resolve_path(app_config.config.category.onnx_path),
+}
 
-def detect_category(input_video_path):
+# Backends aren't all guaranteed to be thread-safe, so sessions sharing a model take turns
+inference_lock = threading.Lock()
+
+def default_backend():
+    """
+    The fastest available classifier backend: an exported quantized model if one is
+    present, else full-precision Keras.
+
+    Returns:
+        str: 'tflite', 'onnx' or 'keras'.
+    """
+    for name in ("tflite", "onnx"):
+        if os.path.exists(MODEL_PATHS[name]):
+            return name
+    return "keras"
+
+for backend_name in BACKENDS:
+    registry.register(f"{MODEL_NAME}/{backend_name}",
+                      lambda backend_name=backend_name: load_backend(backend_name, MODEL_PATHS.get(backend_name)))
+
+def warm_up(backend=None):
+    """
+    Start loading the model in the background, so the first detection doesn't wait for it.
+
+    Args:
+        backend (str, optional): Classifier backend. Defaults to default_backend().
+    """
+    registry.warm_up(f"{MODEL_NAME}/{backend or default_backend()}")
+
+def detect_category(input_video_path, num_frames=10, batch_size=32, seed=None, backend=None):
+    """
+    Detect the category of a video by majority vote over sampled frames.
+
+    Args:
+        input_video_path (str): Path to the video.
+        num_frames (int): Number of frames sampled from the video.
+        batch_size (int): Number of frames classified per forward pass.
+        seed (int, optional): Seed of the frame sampling; the same seed samples the same frames.
+        backend (str, optional): Classifier backend ('keras', 'tflite' or 'onnx'). Defaults to default_backend().
+
+    Returns:
+        str: Most common category of the sampled frames.
+    """
     if input_video_path is not None:
         st.video(input_video_path, format="video/mp4")
 
         # Process video and detect categories
-        categories = process_video(input_video_path)
-        
+        categories = process_video(input_video_path, num_frames, batch_size, seed, backend)
+        if not categories:
+            return 'Unknown'
+
         # Find the most common category
         most_common_category = max(set(categories), key=categories.count)
-        
-        return most_common_category
-
-def predict_category(img_array):
-    # Make predictions
-    predictions = model.predict(img_array)
-
-    # Decode predictions and get the top predicted class
-    decoded_predictions = decode_predictions(predictions, top=1)[0]
-    top_class_index = decoded_predictions[0][0]
+        st.text("Screenshot categories: " + ", ".join(f"{category} x{categories.count(category)}" for category in sorted(set(categories))))
 
-    # Map ImageNet class index to human-readable label
-    category = imagenet_labels.get(top_class_index, 'Unknown')
-    st.text(f"Screenshot category: {category}\n")
-    
-    return category
+        return most_common_category
 
-def process_video(video_path, num_frames=10):
+def predict_categories(frames, batch_size=32, backend=None):
+    """
+    Classify frames with the shared model, one forward pass per batch.
+
+    Args:
+        frames (numpy.ndarray): (N, 299, 299, 3) uint8 RGB frames.
+        batch_size (int): Number of frames per forward pass.
+        backend (str, optional): Classifier backend. Defaults to default_backend().
+
+    Returns:
+        list: Category of every frame.
+    """
+    # Make predictions with the shared model, loaded on first use
+    model = registry.get(f"{MODEL_NAME}/{backend or default_backend()}")
+    with inference_lock:
+        probabilities = predict_batches(model, frames, batch_size)
+
+    # Map the top ImageNet class of every frame to a human-readable label
+    return top_categories(probabilities)
+
+def load_frames(cap, frame_indices):
+    """
+    Read frames of a video in a single forward pass, resized to the model input.
+
+    Args:
+        cap (cv2.VideoCapture): Opened capture.
+        frame_indices (numpy.ndarray): Sorted, distinct frame indices.
+
+    Returns:
+        tuple: (frames, read_indices): (N, 299, 299, 3) uint8 RGB frames and the indices that
+            could be read (frames past the end of the video are missing).
+    """
+    # Sampled frames, resized to the model input and stacked into one uint8 array
+    frames = np.empty((len(frame_indices), INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
+    read_indices = []
+
+    for frame_index, frame in read_frames(cap, frame_indices):
+        # Preprocess the frame for prediction
+        frames[len(read_indices)] = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), (INPUT_SIZE, INPUT_SIZE))
+        read_indices.append(frame_index)
+
+    return frames[:len(read_indices)], np.array(read_indices, dtype=np.int64)
+
+def process_video(video_path, num_frames=10, batch_size=32, seed=None, backend=None):
+    """
+    Sample frames of a video and classify them in batches.
+
+    Args:
+        video_path (str): Path to the video.
+        num_frames (int): Number of frames sampled.
+        batch_size (int): Number of frames per forward pass.
+        seed (int, optional): Seed of the frame sampling.
+        backend (str, optional): Classifier backend.
+
+    Returns:
+        list: Category of every sampled frame.
+    """
     # Open the video file
     cap = cv2.VideoCapture(video_path)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-
-    # Get random frames
-    random_frame_indices = np.random.choice(total_frames, size=num_frames, replace=False)
 
-    categories = []
+    # Get random frames, visited in order in a single forward pass
+    frame_indices = sample_indices(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), num_frames, seed)
+    frames, _ = load_frames(cap, frame_indices)
 
-    for frame_index in random_frame_indices:
-        # Set the frame position
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+    # Release the video capture object
+    cap.release()
 
-        # Read the frame
-        ret, frame = cap.read()
+    # Predict categories
+    return predict_categories(frames, batch_size, backend)
+
+def detect_scene_categories(input_video_path, timeline, frames_per_scene=3, batch_size=32, seed=None, backend=None):
+    """
+    Detect the category of every scene of a video, and of the whole video.
+
+    Frames are sampled per scene (stratified over its length), read in one forward pass
+    over the video and classified together, so the cost follows the number of sampled
+    frames rather than the number of scenes. Every scene gets the most common category of
+    its frames; the video gets the category covering most of its duration.
+
+    Args:
+        input_video_path (str): Path to the video.
+        timeline (Timeline): Scenes of the video.
+        frames_per_scene (int): Number of frames sampled per scene.
+        batch_size (int): Number of frames classified per forward pass.
+        seed (int, optional): Seed of the frame sampling; the same seed samples the same frames.
+        backend (str, optional): Classifier backend ('keras', 'tflite' or 'onnx'). Defaults to default_backend().
+
+    Returns:
+        tuple: (scene_categories, video_category): category of every scene ('Unknown' for scenes
+            without readable frames) and of the whole video.
+    """
+    st.video(input_video_path, format="video/mp4")
+
+    # Sample every scene, then read all the samples in a single forward pass
+    frame_indices, scene_ids = stratified_indices(timeline, frames_per_scene, seed)
+    cap = cv2.VideoCapture(input_video_path)
+    frames, read_indices = load_frames(cap, frame_indices)
+    cap.release()
+    # Both index arrays are sorted and distinct, so read frames keep their scene in order
+    scene_ids = scene_ids[np.isin(frame_indices, read_indices)]
 
-        if ret:
-            # Preprocess the frame for prediction
-            img_array = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img_array = cv2.resize(img_array, (299, 299))
-            img_array = np.expand_dims(img_array, axis=0)
-            img_array = preprocess_input(img_array)
+    # Frames of every scene are classified together in batches
+    categories = predict_categories(frames, batch_size, backend)
 
-            # Predict category
-            category = predict_category(img_array)
-            categories.append(category)
+    votes = [Counter() for _ in range(len(timeline))]
+    for scene_id, category in zip(scene_ids, categories):
+        votes[scene_id][category] += 1
+    scene_categories = [vote.most_common(1)[0][0] if vote else 'Unknown' for vote in votes]
 
-    # Release the video capture object
-    cap.release()
+    # Weight every scene by its length, so a long scene outvotes a few short ones
+    durations = Counter()
+    for (start_frame, end_frame), category in zip(timeline, scene_categories):
+        durations[category] += end_frame - start_frame
+    video_category = durations.most_common(1)[0][0] if durations else 'Unknown'
 
-    return categories
+    st.text("Scene categories: " + ", ".join(f"{i + 1}: {category}" for i, category in enumerate(scene_categories)))
+    return scene_categories, video_category
@@ -1,8 +1,13 @@
 import streamlit as st
-from preprocessing import preprocessing
+import os
+import app_config  # Puts the shared engine modules of src/ on the import path
+from preprocessing import preprocessing, preview_preprocessing
 from timeline import timeline
 from generate_shorts import generate_shorts
-from detect_category import detect_category
+from detect_category import detect_scene_categories, warm_up
+from exclusion_log import ExclusionLog
+from frame_metrics import content_hash
+from scene_timeline import TIMELINE_SUFFIX, Timeline
 from io import BytesIO
 
 # Define the steps
@@ -16,6 +21,9 @@ STEPS = {
 
 st.title("Video Editing Tool")
 
+# Load the category model in the background while the user uploads and preprocesses (once per server process)
+warm_up()
+
 # Initialize step variable
 current_step = 1
 
@@ -82,6 +90,11 @@ if current_step == 2:
         # Checkbox for Noise
         noise_bool = st.checkbox("Enable Noise Filter", value=False)
         noise_threshold = st.slider("Noise Threshold", 0, 100, 30)
+
+        # Frame metrics are analyzed once per video, so previewing new thresholds is instant
+        if isinstance(video_url, BytesIO):
+            kept_frames, total_frames = preview_preprocessing(video_url, quality_bool, quality_threshold, brightness_bool, brightness_threshold, motion_bool, motion_threshold, noise_bool, noise_threshold)
+            st.caption(f"Frames kept with these settings: {kept_frames} / {total_frames}")
         
         # Add a submit button to move to the next step
         if st.form_submit_button("Next Step"):
@@ -110,13 +123,12 @@ if current_step == 3:
         st.video(preprocessing_output_video_path, format="video/mp4", start_time=0)
 
         # Display frame exclusion reasons from the log file
-        with open(log_file_path, 'r') as log_file:
-            reasons = log_file.read()
-            if reasons:
-                st.text("Frame Exclusion Reasons:")
-                st.text(reasons)
-            else:
-                st.text("None of the part is excluded")  
+        exclusion_log = ExclusionLog.load(log_file_path)
+        if len(exclusion_log):
+            st.text("Frame Exclusion Reasons:")
+            st.text(exclusion_log.to_text())
+        else:
+            st.text("None of the part is excluded")  
                 
         if st.form_submit_button("Automatically moved to the Next Step"):
             st.write("Automatically moved to the timeline detection step!")
@@ -129,6 +141,8 @@ if current_step == 4:
         st.success("Timeline detection has automatically started")
         timeline_output_dir = timeline(preprocessing_output_video_path)
         print("timeline_output_dir:", timeline_output_dir)
+        # Exact scene frames, saved next to the text log
+        scene_timeline = Timeline.load(os.path.splitext(timeline_output_dir)[0] + TIMELINE_SUFFIX)
         with open(timeline_output_dir, 'r') as log_file:
             timeline_content = log_file.read()
             if timeline_content:
@@ -149,9 +163,12 @@ import os
 if current_step == 5:
     with st.form("step_5_form"):
         st.header("STEP 4-1: Detect Category")
-        st.success("Category detection has automatically started. 10 random scenes are extracted from video to detect category.")
+        st.success("Category detection has automatically started. A few frames of every detected scene are extracted to detect categories.")
         # TODO: detect category
-        most_common_category = detect_category(preprocessing_output_video_path)
+        # Frames sampled from every scene are classified together, one forward pass per batch
+        scene_categories, most_common_category = detect_scene_categories(preprocessing_output_video_path, scene_timeline,
+                                                                          frames_per_scene=app_config.config.category.frames_per_scene,
+                                                                          batch_size=app_config.config.category.batch_size)
         
         # Add a message below the video
         st.markdown(f"**Most Common Detected Category: {most_common_category}**", unsafe_allow_html=True)
@@ -175,7 +192,15 @@ if current_step == 6:
     with st.form("step_6_form"):
         st.header("STEP 5: Download shorts")
         st.success("Shorts are generating!")
-        videos = generate_shorts(timeline_content, preprocessing_output_video_path)
+        # Streamlit reruns the whole script on every widget change (e.g. selecting a clip below),
+        # so the clips are exported once per processed video and timeline and reused afterwards
+        shorts_key = (content_hash(preprocessing_output_video_path), tuple(scene_timeline))
+        videos = st.session_state.get("shorts_videos")
+        if st.session_state.get("shorts_key") != shorts_key or not all(os.path.exists(path) for path in videos):
+            # Worker processes rendering clips in parallel, as for the CLI (config.shorts.workers)
+            videos = generate_shorts(scene_timeline, preprocessing_output_video_path, workers=app_config.config.shorts.workers)
+            st.session_state["shorts_key"] = shorts_key
+            st.session_state["shorts_videos"] = videos
                     
         # Display the generated video clips
         if videos:
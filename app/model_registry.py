@@ -0,0 +1,89 @@
+import threading
+
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ModelRegistry:
+    """
+    Process-wide models, each loaded lazily on first use and then shared.
+
+    Streamlit reruns the app script for every interaction and every session, but
+    imported modules live for the whole server process, so a registry at module level
+    holds a single instance of every model for all sessions. Every model has its own
+    load lock, so concurrent first uses load it only once while other models, and the
+    registry's bookkeeping (see warm_up), stay available during the load.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._load_locks = {}
+        self._models = {}
+        self._warm_up_threads = {}
+        # Guards the warm-up bookkeeping only; never held while a model loads
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        """
+        Declare a model without loading it.
+
+        Args:
+            name (str): Name of the model.
+            loader (callable): Function without arguments returning the loaded model.
+        """
+        self._loaders[name] = loader
+        self._load_locks[name] = threading.Lock()
+
+    def get(self, name):
+        """
+        The model registered under `name`, loading it if this is its first use.
+
+        Args:
+            name (str): Name of the model.
+
+        Returns:
+            The loaded model.
+        """
+        model = self._models.get(name)
+        if model is None:
+            with self._load_locks[name]:
+                # Another thread may have loaded it while this one waited
+                model = self._models.get(name)
+                if model is None:
+                    logger.info(f"🔥 Loading model: {name}")
+                    model = self._loaders[name]()
+                    self._models[name] = model
+                    logger.info(f"🔥 Model loaded: {name}")
+        return model
+
+    def is_loaded(self, name):
+        """bool: Whether the model has been loaded already."""
+        return name in self._models
+
+    def warm_up(self, name):
+        """
+        Start loading a model in a background thread, once per process.
+
+        Returns immediately, also while the model is loading (e.g. on every Streamlit rerun).
+
+        Args:
+            name (str): Name of the model.
+        """
+        with self._lock:
+            if name in self._models or name in self._warm_up_threads:
+                return
+            thread = threading.Thread(target=self._warm_up, args=(name,), name=f"warm-up-{name}", daemon=True)
+            self._warm_up_threads[name] = thread
+        thread.start()
+
+    def _warm_up(self, name):
+        try:
+            self.get(name)
+        except Exception:
+            # The first real use retries and surfaces the error
+            logger.exception(f"Warming up {name} failed.")
+            with self._lock:
+                del self._warm_up_threads[name]
+
+# Shared by every Streamlit session of the server process
+registry = ModelRegistry()
@@ -1,77 +1,114 @@
 import cv2
+import glob
+import hashlib
 import os
+import shutil
 from tqdm import tqdm 
 import tempfile
 import streamlit as st
+
+import app_config  # Puts the shared engine modules of src/ on the import path
+from exclusion_log import ExclusionLog
+from frame_metrics import enabled_metrics, load_or_analyze, cut, replay_cut
+from pipeline import prefetch
+
 import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def is_dark(frame, brightness_threshold):
+# Uploads kept (with their frame metrics); the least recently used ones beyond this are deleted
+MAX_UPLOADS = 8
+
+def save_upload(uploaded_file):
     """
-    Check if a frame is dark based on its brightness.
+    Save an uploaded video under a path derived from its content.
+
+    Re-running the app with the same upload reuses the same file, and with it the
+    frame-metrics file stored next to it. Only the MAX_UPLOADS most recently used
+    uploads are kept.
 
     Args:
-        frame (numpy.ndarray): Input frame.
-        brightness_threshold (float): Threshold for darkness.
+        uploaded_file (UploadedFile): Uploaded video file.
 
     Returns:
-        bool: True if the frame is dark, False otherwise.
+        str: Path to the saved video.
     """
-    # Convert the frame to grayscale
-    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    
-    # Calculate the average brightness
-    avg_brightness = cv2.mean(gray_frame)[0]
-    return avg_brightness < brightness_threshold
-
-def is_shaky(frame, prev_frame, motion_threshold):
+    data = uploaded_file.getvalue()
+    upload_dir = os.path.join(tempfile.gettempdir(), 'video_editing_tool')
+    os.makedirs(upload_dir, exist_ok=True)
+
+    file_path = os.path.join(upload_dir, f"{hashlib.blake2b(data, digest_size=16).hexdigest()}.mp4")
+    if os.path.exists(file_path):
+        # Mark the upload as recently used
+        os.utime(file_path)
+    else:
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        prune_uploads(upload_dir)
+    return file_path
+
+def prune_uploads(upload_dir, max_uploads=MAX_UPLOADS):
     """
-    Check if a frame is shaky based on motion analysis with the previous frame.
+    Delete the least recently used uploads beyond `max_uploads`, with their frame metrics.
 
     Args:
-        frame (numpy.ndarray): Current frame.
-        prev_frame (numpy.ndarray): Previous frame.
-        motion_threshold (float): Threshold for shakiness.
-
-    Returns:
-        bool: True if the frame is shaky, False otherwise.
+        upload_dir (str): Directory of the saved uploads.
+        max_uploads (int): Number of uploads to keep.
     """
-    # Convert frames to grayscale
-    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    gray_prev_frame = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
-
-    # Calculate dense optical flow using Farneback method
-    flow = cv2.calcOpticalFlowFarneback(gray_prev_frame, gray_frame, None, 0.5, 3, 15, 3, 5, 1.2, 0)
-
-    # Compute the magnitude of the motion vectors
-    motion_magnitude = cv2.norm(flow, cv2.NORM_L2)
-
-    return motion_magnitude > motion_threshold
+    uploads = [os.path.join(upload_dir, name) for name in os.listdir(upload_dir) if name.endswith('.mp4')]
+    if len(uploads) <= max_uploads:
+        return
 
-def is_noisy(frame, noise_threshold):
+    uploads.sort(key=os.path.getmtime)
+    for stale_path in uploads[:len(uploads) - max_uploads]:
+        # Metrics directories are named after the video (see frame_metrics.metrics_path)
+        for metrics_dir in glob.glob(glob.escape(stale_path) + ".*.metrics"):
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+        try:
+            os.remove(stale_path)
+        except FileNotFoundError:
+            # Already deleted by another session
+            pass
+    logger.info(f"Deleted {len(uploads) - max_uploads} old uploads from {upload_dir}")
+
+def build_settings(quality_bool, quality_threshold, brightness_bool, brightness_threshold, motion_bool, motion_threshold, noise_bool, noise_threshold):
     """
-    Check if a frame is noisy based on image noise analysis.
-
-    Args:
-        frame (numpy.ndarray): Input frame.
-        noise_threshold (float): Threshold for noise.
+    Collect the filter parameters into the settings mapping used by the scoring engine.
 
     Returns:
-        bool: True if the frame is noisy, False otherwise.
+        dict: Same keys as the `preprocessing` config section.
     """
-    # Apply Gaussian blur to the frame
-    blurred_frame = cv2.GaussianBlur(frame, (5, 5), 0)
+    return {
+        "quality_bool": quality_bool,
+        "quality_threshold": quality_threshold,
+        "brightness_bool": brightness_bool,
+        "brightness_threshold": brightness_threshold,
+        "motion_bool": motion_bool,
+        "motion_threshold": motion_threshold,
+        "noise_bool": noise_bool,
+        "noise_threshold": noise_threshold,
+    }
+
+def preview_preprocessing(uploaded_file, quality_bool, quality_threshold, brightness_bool, brightness_threshold, motion_bool, motion_threshold, noise_bool, noise_threshold, batch_size=16):
+    """
+    Count the frames the given filter settings would keep, without rendering anything.
 
-    # Calculate the absolute difference between the original frame and the blurred frame
-    frame_diff = cv2.absdiff(frame, blurred_frame)
+    Each enabled filter's metric is measured on the first call that needs it; afterwards
+    this is a few vectorized comparisons over the stored frame metrics.
 
-    # Calculate the mean pixel difference
-    mean_diff = cv2.mean(frame_diff)[0]
+    Returns:
+        tuple: (kept_frames, total_frames).
+    """
+    settings = build_settings(quality_bool, quality_threshold, brightness_bool, brightness_threshold, motion_bool, motion_threshold, noise_bool, noise_threshold)
+    # Only the enabled filters' metrics are measured; enabling another filter later measures just that one
+    metrics = load_or_analyze(save_upload(uploaded_file), batch_size, metric_names=enabled_metrics(settings))
+    if metrics is None:
+        return 0, 0
 
-    return mean_diff > noise_threshold
+    keep_mask, _ = cut(metrics, settings)
+    return int(keep_mask.sum()), len(keep_mask)
 
-def preprocessing(uploaded_file, quality_bool, quality_threshold, brightness_bool, brightness_threshold, motion_bool, motion_threshold, noise_bool, noise_threshold):
+def preprocessing(uploaded_file, quality_bool, quality_threshold, brightness_bool, brightness_threshold, motion_bool, motion_threshold, noise_bool, noise_threshold, batch_size=16):
     """
     Process a video, saving frames that meet a quality threshold and logging the process.
 
@@ -84,18 +121,17 @@ def preprocessing(uploaded_file, quality_bool, quality_threshold, brightness_boo
         motion_threshold (float): Threshold for motion.
         noise_bool (bool): Enable noise filter.
         noise_threshold (float): Threshold for noise.
+        batch_size (int): Number of frames decoded and scored together.
     """
     # Create a temporary directory to store the output video and log file
     temp_dir = tempfile.mkdtemp()
 
     # Define the paths for the output video and log file within the temporary directory
     output_video_path = os.path.join(temp_dir, 'output_video.mp4')
-    log_file_path = os.path.join(temp_dir, 'processing_log.txt')
+    log_file_path = os.path.join(temp_dir, 'processing_log.jsonl')
 
-    # Save the uploaded file to a temporary location
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_file:
-        temp_file.write(uploaded_file.read())
-        temp_file_path = temp_file.name
+    # Save the uploaded file to a location derived from its content
+    temp_file_path = save_upload(uploaded_file)
 
     cap = cv2.VideoCapture(temp_file_path)
 
@@ -117,63 +153,41 @@ def preprocessing(uploaded_file, quality_bool, quality_threshold, brightness_boo
                     
     logger.info("🔥 Processing starts.")
 
-    deleted_frames = []  # Store deleted frame information
-
-    with open(log_file_path, 'w') as log_file:
-        processed_frames = 0        
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                logger.warning(f"Reached the end of the video or encountered an issue while reading the video. File path: {temp_file_path}")
-                break
-
-            frame_quality = cv2.mean(frame)[0]
-            exclude_reasons = []  # Store reasons for frame exclusion
-
-            if quality_bool and frame_quality < quality_threshold:
-                exclude_reasons.append("Quality below threshold")
-
-            if brightness_bool and is_dark(frame, brightness_threshold):
-                exclude_reasons.append("Dark frame")
-
-            if motion_bool and is_shaky(frame, prev_frame, motion_threshold):
-                exclude_reasons.append("Shaky frame")
-
-            if noise_bool and is_noisy(frame, noise_threshold):
-                exclude_reasons.append("Noisy frame")
-
-            if not exclude_reasons:
-                out.write(frame)
-                saved_frame_count += 1
-            else:
-                if not deleted_frames:
-                    deleted_frames.append((frame_count * frame_interval, exclude_reasons[0]))
-                else:
-                    last_deleted_time, last_deleted_reason = deleted_frames[-1]
-                    if exclude_reasons[0] != last_deleted_reason:
-                        deleted_frames[-1] = (last_deleted_time, f"{last_deleted_reason} - {exclude_reasons[0]}")
-                    deleted_frames[-1] = (last_deleted_time, exclude_reasons[0])
-
-            processed_frames += 1
-            progress_percent = processed_frames / total_frames * 100
-            if progress_percent == 25.00 or progress_percent == 50.00 or progress_percent == 75.00:
-                st.text(f"Processing: {progress_percent:.2f}%")
-            frame_count += 1
-            prev_frame = frame
-
-            logger.info(f"Processed {frame_count} frames, Saved {saved_frame_count} frames")
-
-            # Update the tqdm progress bar
-            progress_bar.update(1)
-
-        # Close the tqdm progress bar
-        progress_bar.close()
-
-        # Log the deleted frames
-        for time, reason in deleted_frames:
-            log_file.write(f"Deleted frame at time {time:.2f} seconds. Reasons: {reason}\n")
+    settings = build_settings(quality_bool, quality_threshold, brightness_bool, brightness_threshold, motion_bool, motion_threshold, noise_bool, noise_threshold)
+
+    # Analyze once per video (stored next to the upload), then cut with the current thresholds
+    metrics = load_or_analyze(temp_file_path, batch_size, metric_names=enabled_metrics(settings))
+    all_keep_mask, all_reasons = cut(metrics, settings)
+
+    processed_frames = 0        
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    next_progress_percent = 25
+
+    # Frames are decoded in batches in a background thread, overlapping with writing
+    for frames, keep_mask, reasons, _ in prefetch(replay_cut(cap, all_keep_mask, all_reasons, batch_size)):
+        for frame in frames[keep_mask]:
+            out.write(frame)
+        frame_count += len(frames)
+        saved_frame_count += int(keep_mask.sum())
+
+        processed_frames += len(frames)
+        progress_percent = processed_frames / total_frames * 100
+        if next_progress_percent < 100 and progress_percent >= next_progress_percent:
+            st.text(f"Processing: {next_progress_percent:.2f}%")
+            next_progress_percent += 25
+
+        logger.info(f"Processed {frame_count} frames, Saved {saved_frame_count} frames")
+
+        # Update the tqdm progress bar
+        progress_bar.update(len(frames))
+
+    logger.warning(f"Reached the end of the video or encountered an issue while reading the video. File path: {temp_file_path}")
+
+    # Close the tqdm progress bar
+    progress_bar.close()
+
+    # Log the deleted frames as runs sharing the same reasons
+    ExclusionLog.from_reasons(all_reasons, cap.get(cv2.CAP_PROP_FPS)).save(log_file_path)
 
     logger.info("🔥 Processing complete.")
     logger.info(f"Output video duration: {saved_frame_count * frame_interval:.2f} seconds")
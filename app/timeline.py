@@ -1,33 +1,79 @@
-from scenedetect import VideoManager
-from scenedetect import SceneManager
-from scenedetect.detectors import ContentDetector
+import cv2
 import os
 import logging
 from tqdm import tqdm
 import streamlit as st
+from scenedetect import FrameTimecode
+from scenedetect.detectors import ContentDetector
+
+import app_config  # Puts the shared engine modules of src/ on the import path
+from parallel_scene_detection import detect_scenes_parallel
+from pipeline import prefetch
+from scene_detection import detect_scenes, detect_scenes_coarse_to_fine, detect_scenes_native, iter_scenes_native
+from scene_timeline import TIMELINE_SUFFIX, Timeline
+from timeline_cache import CACHE_PARAMS, TimelineCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def timeline(input_video_path):
+# Timelines shared with the timeline.py CLI: same directory, and keys built from the same settings
+timeline_cache = None
+if app_config.config.timeline.cache:
+    timeline_cache = TimelineCache(app_config.resolve_path(app_config.config.timeline.cache_dir),
+                                   app_config.config.timeline.cache_entries)
+
+def detect_scene_list(cap, input_video_path, detection):
     """
-    Perform scene detection on a video and save the scene list to 'timeline_log.txt'.
+    Detect scenes with the detector selected in config.timeline, as the timeline.py CLI does.
+
+    Args:
+        cap (cv2.VideoCapture): Opened video.
+        input_video_path (str): Path to the same video.
+        detection (DictConfig): Detector settings (config.timeline).
+
+    Returns:
+        list: (start, end) FrameTimecode of every scene.
     """
-    scene_log = ""
+    if detection.detector == "native" and detection.workers > 1 and detection.frame_skip == 0:
+        return detect_scenes_parallel(input_video_path, detection.threshold, detection.min_scene_len, detection.workers, detection.batch_size)
+    if detection.detector == "native":
+        return detect_scenes_native(cap, detection.threshold, detection.min_scene_len, detection.frame_skip, detection.batch_size)
+    if detection.detector == "coarse":
+        return detect_scenes_coarse_to_fine(cap, detection.threshold, detection.min_scene_len, detection.coarse_step,
+                                            detection.candidate_ratio, detection.batch_size)
+    # Same cuts as the CLI's VideoManager + ContentDetector path
+    return detect_scenes(cap, ContentDetector(detection.threshold, detection.min_scene_len))
 
-    video_manager = VideoManager([input_video_path])
+def timeline(input_video_path, detection=None):
+    """
+    Perform scene detection on a video and save the scene list to 'timeline_log.txt'.
 
-    # Create a SceneManager and add ContentDetector to it.
-    scene_manager = SceneManager()
-    scene_manager.add_detector(ContentDetector())
+    The exact scene frames are saved next to it as 'timeline_log.npz' (see scene_timeline.Timeline).
 
-    # Set the video manager and scene manager to process the video.
-    video_manager.set_downscale_factor()
+    Args:
+        input_video_path (str): Path to the video.
+        detection (DictConfig): Detector settings; config.timeline when omitted.
 
-    logger.info("🔥 Scene detection starts.")
-    video_manager.start()  # Start the video manager.
-    scene_manager.detect_scenes(frame_source=video_manager)  # Perform scene detection.
-    scene_list = scene_manager.get_scene_list()  # Create the scene list.
+    Returns:
+        str: Path of the text timeline log.
+    """
+    if detection is None:
+        detection = app_config.config.timeline
+    scene_log = ""
+
+    cap = cv2.VideoCapture(input_video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+
+    cached_timeline = None
+    if timeline_cache is not None:
+        cache_key = TimelineCache.key(input_video_path, {name: detection[name] for name in CACHE_PARAMS})
+        cached_timeline = timeline_cache.get(cache_key)
+    if cached_timeline is not None:
+        logger.info("🔥 Scene list loaded from the timeline cache.")
+        scene_list = [(FrameTimecode(start, fps), FrameTimecode(end, fps)) for start, end in cached_timeline]
+    else:
+        logger.info("🔥 Scene detection starts.")
+        scene_list = detect_scene_list(cap, input_video_path, detection)
 
     total_scenes = len(scene_list)
 
@@ -40,7 +86,7 @@ def timeline(input_video_path):
         if progress_percent == 25 or 50 or 75:  # Update at 25%, 50%, 75% completion
             
             st.text(f"Processing: {progress_percent:.2f}%")
-    video_manager.release()  # Release the video manager.
+    cap.release()
 
     # Save the scene log to 'timeline_log.txt' in the 'data/log' folder
     log_folder = os.path.join('data', 'log')
@@ -49,5 +95,43 @@ def timeline(input_video_path):
 
     with open(log_file_path, 'w') as log_file:
         log_file.write(scene_log)
+    scene_timeline = Timeline.from_scene_list(scene_list, fps)
+    scene_timeline.save(os.path.splitext(log_file_path)[0] + TIMELINE_SUFFIX)
+    if timeline_cache is not None and cached_timeline is None:
+        timeline_cache.put(cache_key, scene_timeline)
 
     return log_file_path
+
+def iter_timeline(input_video_path, detection=None):
+    """
+    Detect scenes in a background thread, yielding each one as soon as its end is confirmed.
+
+    Pass the result to generate_shorts to encode clips while later scenes are still being detected.
+    The scenes are written to 'timeline_log.txt' as they are found.
+
+    Args:
+        input_video_path (str): Path to the video.
+        detection (DictConfig): Detector settings; config.timeline when omitted. Scenes are
+            always streamed by the native detector.
+
+    Yields:
+        tuple: (start, end) FrameTimecode of every scene.
+    """
+    if detection is None:
+        detection = app_config.config.timeline
+    cap = cv2.VideoCapture(input_video_path)
+
+    log_folder = os.path.join('data', 'log')
+    os.makedirs(log_folder, exist_ok=True)
+    log_file_path = os.path.join(log_folder, 'timeline_log.txt')
+
+    logger.info("🔥 Scene detection starts.")
+    try:
+        with open(log_file_path, 'w') as log_file:
+            for i, scene in enumerate(prefetch(iter_scenes_native(cap, detection.threshold, detection.min_scene_len,
+                                                                                detection.frame_skip, detection.batch_size))):
+                log_file.write(f"Scene {i + 1}: Start frame {scene[0]} - End frame {scene[1]}\n")
+                log_file.flush()
+                yield scene
+    finally:
+        cap.release()
@@ -0,0 +1,448 @@
+import cv2
+import numpy as np
+
+from stabilization import batch_transforms, shake_scores
+
+# Reasons for frame exclusion, stored as a bitmask per frame
+REASON_QUALITY = 1
+REASON_DARK = 2
+REASON_SHAKY = 4
+REASON_NOISY = 8
+
+REASON_LABELS = {
+    REASON_QUALITY: "Quality below threshold",
+    REASON_DARK: "Dark frame",
+    REASON_SHAKY: "Shaky frame",
+    REASON_NOISY: "Noisy frame",
+}
+
+def describe_reasons(reason_mask):
+    """
+    Convert a reason bitmask into the human-readable exclusion reasons.
+
+    Args:
+        reason_mask (int): Bitmask of REASON_* flags.
+
+    Returns:
+        list: Reason labels in filter order.
+    """
+    return [label for flag, label in REASON_LABELS.items() if int(reason_mask) & flag]
+
+def read_batches(cap, batch_size=16, max_frames=None):
+    """
+    Decode frames from a capture into fixed-size batches.
+
+    Args:
+        cap (cv2.VideoCapture): Opened video capture.
+        batch_size (int): Number of frames per batch.
+        max_frames (int, optional): Stop after this many frames instead of at the end of the video.
+
+    Yields:
+        numpy.ndarray: Array of shape (N, H, W, 3) with N <= batch_size. Only the last batch can be shorter.
+    """
+    remaining = max_frames
+    while remaining is None or remaining > 0:
+        current_batch_size = batch_size if remaining is None else min(batch_size, remaining)
+        batch = None
+        count = 0
+        while count < current_batch_size:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if batch is None:
+                batch = np.empty((current_batch_size,) + frame.shape, dtype=frame.dtype)
+            batch[count] = frame
+            count += 1
+
+        if count == 0:
+            return
+        yield batch[:count]
+        if count < current_batch_size:
+            return
+        if remaining is not None:
+            remaining -= count
+
+def batch_resize(frames, scale):
+    """
+    Downscale a batch of frames to an analysis proxy.
+
+    Args:
+        frames (numpy.ndarray): Batch of frames (N, H, W, C).
+        scale (float): Scale factor in (0, 1]. 1 returns the frames unchanged.
+
+    Returns:
+        numpy.ndarray: Downscaled frames (N, h, w, C).
+    """
+    if scale >= 1:
+        return frames
+
+    height, width = frames.shape[1:3]
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    proxy = np.empty((len(frames), size[1], size[0]) + frames.shape[3:], dtype=frames.dtype)
+    for i, frame in enumerate(frames):
+        # INTER_AREA averages whole source pixels, so mean intensity and brightness are preserved
+        cv2.resize(frame, size, dst=proxy[i], interpolation=cv2.INTER_AREA)
+    return proxy
+
+def batch_mean_intensity(frames):
+    """
+    Mean of the first channel of every frame, i.e. cv2.mean(frame)[0] for the whole batch.
+
+    Args:
+        frames (numpy.ndarray): Batch of BGR frames (N, H, W, 3).
+
+    Returns:
+        numpy.ndarray: float64 array of shape (N,).
+    """
+    num_pixels = frames.shape[1] * frames.shape[2]
+    return frames[..., 0].sum(axis=(1, 2), dtype=np.uint64) / num_pixels
+
+def batch_gray(frames):
+    """
+    Convert a batch of BGR frames to grayscale with a single cv2 call.
+
+    The batch is viewed as one tall image, so the result is bit-identical to
+    converting each frame on its own.
+
+    Args:
+        frames (numpy.ndarray): Batch of BGR frames (N, H, W, 3).
+
+    Returns:
+        numpy.ndarray: Grayscale frames (N, H, W).
+    """
+    num_frames, height, width = frames.shape[:3]
+    frames = np.ascontiguousarray(frames)
+    gray = cv2.cvtColor(frames.reshape(num_frames * height, width, 3), cv2.COLOR_BGR2GRAY)
+    return gray.reshape(num_frames, height, width)
+
+def batch_brightness(gray_frames):
+    """
+    Average brightness of every grayscale frame, i.e. cv2.mean(gray_frame)[0] for the whole batch.
+
+    Args:
+        gray_frames (numpy.ndarray): Grayscale frames (N, H, W).
+
+    Returns:
+        numpy.ndarray: float64 array of shape (N,).
+    """
+    num_pixels = gray_frames.shape[1] * gray_frames.shape[2]
+    return gray_frames.sum(axis=(1, 2), dtype=np.uint64) / num_pixels
+
+def batch_noise(frames):
+    """
+    Noise score of every frame: cv2.mean(cv2.absdiff(frame, GaussianBlur(frame, (5, 5), 0)))[0].
+
+    The score only looks at the first channel of |frame - blur(frame)|, so only that
+    channel is blurred. Each frame is reflect-padded by the kernel radius and the
+    padded frames are stacked into one tall image, which lets a single GaussianBlur
+    call cover the batch while every kept pixel only sees its own frame.
+
+    Args:
+        frames (numpy.ndarray): Batch of BGR frames (N, H, W, 3).
+
+    Returns:
+        numpy.ndarray: float64 array of shape (N,).
+    """
+    num_frames, height, width = frames.shape[:3]
+    radius = 2  # Half of the (5, 5) blur kernel
+
+    channel = np.ascontiguousarray(frames[..., 0])
+    # numpy's 'reflect' mode matches OpenCV's default BORDER_REFLECT_101
+    padded = np.pad(channel, ((0, 0), (radius, radius), (radius, radius)), mode='reflect')
+    padded_height, padded_width = padded.shape[1:]
+
+    blurred = cv2.GaussianBlur(padded.reshape(num_frames * padded_height, padded_width), (5, 5), 0)
+    blurred = blurred.reshape(num_frames, padded_height, padded_width)[:, radius:-radius, radius:-radius]
+
+    frame_diff = cv2.absdiff(channel.reshape(num_frames * height, width),
+                             np.ascontiguousarray(blurred).reshape(num_frames * height, width))
+    return frame_diff.reshape(num_frames, -1).sum(axis=1, dtype=np.uint64) / (height * width)
+
+def batch_motion(gray_frames, prev_gray=None):
+    """
+    Optical-flow motion magnitude of every frame against its predecessor: the L2 norm of the Farneback flow.
+
+    Args:
+        gray_frames (numpy.ndarray): Grayscale frames (N, H, W).
+        prev_gray (numpy.ndarray, optional): Grayscale frame preceding the batch. The first frame
+            of the video has no predecessor and gets a motion of 0.
+
+    Returns:
+        numpy.ndarray: float64 array of shape (N,).
+    """
+    motion = np.zeros(len(gray_frames), dtype=np.float64)
+    for i, gray_frame in enumerate(gray_frames):
+        if prev_gray is not None:
+            flow = cv2.calcOpticalFlowFarneback(prev_gray, gray_frame, None, 0.5, 3, 15, 3, 5, 1.2, 0)
+            motion[i] = cv2.norm(flow, cv2.NORM_L2)
+        prev_gray = gray_frame
+    return motion
+
+# Frame pairs of every batch also measured at full resolution to calibrate proxy motion
+CALIBRATION_PAIRS = 2
+
+def calibrate_motion(frames, proxy_motion, scale):
+    """
+    Convert motion measured on a proxy to full-resolution units with a mapping measured on the batch itself.
+
+    The flow norm of a real global displacement shrinks with scale ** 2 (pixel count and
+    displacement both shrink), but the flow of near-static, noisy footage shrinks far less,
+    so no constant factor keeps thresholds comparable across scales. Instead, CALIBRATION_PAIRS
+    frame pairs spread over the batch are also measured at full resolution, and every proxy
+    value is multiplied by the full/proxy ratio of the samples of similar magnitude
+    (interpolated in log space). Only the batch's own frames are used, so a frame's motion
+    doesn't depend on how much of the video was scored before it (parallel chunks score the
+    same batches as a serial run, see parallel_preprocessing.split_ranges).
+
+    Args:
+        frames (numpy.ndarray): Full-resolution batch of BGR frames (N, H, W, 3).
+        proxy_motion (numpy.ndarray): Motion of every frame measured on the proxy (see batch_motion).
+        scale (float): Scale of the proxy.
+
+    Returns:
+        numpy.ndarray: Motion in full-resolution units.
+    """
+    # Second frame of every pair, spread over the batch; both frames of a pair are in the batch
+    pair_ends = np.unique(np.linspace(1, len(frames) - 1, CALIBRATION_PAIRS).astype(int)) if len(frames) > 1 else []
+    samples = []
+    for i in pair_ends:
+        if proxy_motion[i] > 0:
+            gray_pair = batch_gray(frames[i - 1:i + 1])
+            flow = cv2.calcOpticalFlowFarneback(gray_pair[0], gray_pair[1], None, 0.5, 3, 15, 3, 5, 1.2, 0)
+            samples.append((proxy_motion[i], cv2.norm(flow, cv2.NORM_L2)))
+    if not samples:
+        # No pair to measure (e.g. a 1-frame batch): assume a global displacement
+        return proxy_motion / scale ** 2
+
+    sample_proxy, sample_full = np.array(sorted(samples)).T
+    log_ratios = np.log(np.maximum(sample_full, 1e-9) / sample_proxy)
+    # Flat beyond the measured range
+    log_factors = np.interp(np.log(np.maximum(proxy_motion, 1e-9)), np.log(sample_proxy), log_ratios)
+    return proxy_motion * np.exp(log_factors)
+
+def score_batch(frames, settings, motion_state=None):
+    """
+    Compute the quality metrics needed by the enabled filters for a whole batch.
+
+    With `analysis_scale` below 1, quality, brightness and motion are measured on a
+    downscaled proxy of the batch. Motion is converted back to full-resolution units with
+    a mapping calibrated on every batch (see calibrate_motion), so `motion_threshold` keeps
+    its meaning; frames whose motion is close to the threshold can still be decided
+    differently than at full resolution. Noise is a high-frequency measure that
+    downscaling removes, so it is always measured at full resolution.
+
+    `motion_method` selects the motion metric: 'dense' is the Farneback flow magnitude
+    compared against `motion_threshold`; 'sparse' is the jitter of the global camera
+    motion fitted to tracked features (see stabilization.shake_scores), compared against
+    `shake_threshold` and an order of magnitude cheaper.
+
+    With `subsample_step` above 1, quality, brightness and noise come from
+    subsampled_metrics instead of being measured on every frame.
+
+    With `stabilize_bool`, the global camera motion of every frame (the transforms the
+    sparse method scores) is returned as well, so the output can be stabilized while it
+    is written (see stabilization.Stabilizer).
+
+    Args:
+        frames (numpy.ndarray): Batch of BGR frames (N, H, W, 3).
+        settings (Mapping): Filter settings, same keys as the `preprocessing` config section.
+        motion_state (dict, optional): Motion state of the frame preceding the batch, as returned
+            by the previous call.
+
+    Returns:
+        tuple: (metrics, motion_state). `metrics` maps 'quality', 'brightness', 'motion' and 'noise'
+            to float arrays (NaN when the filter is disabled), and 'transform' to the (N, 3) global
+            motion (dx, dy, da) in full-resolution pixels (None without `stabilize_bool`).
+            `motion_state` holds the grayscale proxy (and global motion) of the last frame, to be
+            passed to the next call (None if no motion is measured).
+    """
+    num_frames = len(frames)
+    disabled = np.full(num_frames, np.nan)
+    metrics = {"quality": disabled, "brightness": disabled, "motion": disabled, "noise": disabled, "transform": None}
+
+    # Quality, brightness and noise are sampled every `subsample_step` frames and refined where they change
+    subsampled = settings.get("subsample_step", 1) > 1 and num_frames > 2
+    if subsampled:
+        metrics.update(subsampled_metrics(frames, settings))
+
+    scale = settings.get("analysis_scale", 1.0)
+    motion_bool = settings.get("motion_bool", False)
+    sparse = motion_bool and settings.get("motion_method", "dense") == "sparse"
+    # Global camera motion, for the sparse shake score and for stabilization
+    track = sparse or settings.get("stabilize_bool", False)
+    proxy = None
+    if motion_bool or track or not subsampled:
+        proxy = batch_resize(frames, scale)
+
+    if settings.get("quality_bool", True) and not subsampled:
+        metrics["quality"] = batch_mean_intensity(proxy)
+
+    gray_frames = None
+    if (settings.get("brightness_bool", False) and not subsampled) or motion_bool or track:
+        gray_frames = batch_gray(proxy)
+
+    if settings.get("brightness_bool", False) and not subsampled:
+        metrics["brightness"] = batch_brightness(gray_frames)
+
+    next_motion_state = None
+    if motion_bool or track:
+        prev_gray = None if motion_state is None else motion_state["gray"]
+        last_transform = None
+        if track:
+            transforms = batch_transforms(gray_frames, prev_gray)
+            last_transform = transforms[-1]
+            if settings.get("stabilize_bool", False):
+                # Translations were measured on the proxy; the warp moves full-resolution pixels
+                metrics["transform"] = transforms * [1 / min(scale, 1.0), 1 / min(scale, 1.0), 1]
+        if sparse:
+            prev_transform = None if motion_state is None else motion_state["transform"]
+            proxy_size = (proxy.shape[2], proxy.shape[1])
+            metrics["motion"] = shake_scores(transforms, prev_transform, proxy_size)
+        elif motion_bool:
+            metrics["motion"] = batch_motion(gray_frames, prev_gray)
+            if scale < 1:
+                metrics["motion"] = calibrate_motion(frames, metrics["motion"], scale)
+        next_motion_state = {"gray": gray_frames[-1], "transform": last_transform}
+
+    if settings.get("noise_bool", False) and not subsampled:
+        metrics["noise"] = batch_noise(frames)
+
+    return metrics, next_motion_state
+
+def motion_threshold(settings):
+    """
+    Threshold the motion metric is compared against, depending on the motion method.
+
+    Args:
+        settings (Mapping): Filter settings, same keys as the `preprocessing` config section.
+
+    Returns:
+        float: `shake_threshold` for the sparse method, `motion_threshold` otherwise.
+    """
+    if settings.get("motion_method", "dense") == "sparse":
+        return settings["shake_threshold"]
+    return settings["motion_threshold"]
+
+def apply_thresholds(metrics, settings):
+    """
+    Turn per-frame metrics into exclusion reasons with vectorized comparisons.
+
+    Args:
+        metrics (dict): Metric arrays as returned by score_batch.
+        settings (Mapping): Filter settings, same keys as the `preprocessing` config section.
+
+    Returns:
+        tuple: (keep_mask, reasons). `keep_mask` is a boolean array, `reasons` a uint8 bitmask array.
+    """
+    reasons = np.zeros(len(metrics["quality"]), dtype=np.uint8)
+
+    if settings.get("quality_bool", True):
+        reasons[metrics["quality"] < settings["quality_threshold"]] |= REASON_QUALITY
+
+    if settings.get("brightness_bool", False):
+        reasons[metrics["brightness"] < settings["brightness_threshold"]] |= REASON_DARK
+
+    if settings.get("motion_bool", False):
+        reasons[metrics["motion"] > motion_threshold(settings)] |= REASON_SHAKY
+
+    if settings.get("noise_bool", False):
+        reasons[metrics["noise"] > settings["noise_threshold"]] |= REASON_NOISY
+
+    return reasons == 0, reasons
+
+# Filters that change slowly within a shot, and the threshold each metric is compared against
+SUBSAMPLED_FILTERS = {
+    "quality": ("quality_bool", "quality_threshold"),
+    "brightness": ("brightness_bool", "brightness_threshold"),
+    "noise": ("noise_bool", "noise_threshold"),
+}
+
+def subsampled_metrics(frames, settings):
+    """
+    Quality, brightness and noise of a batch, measured on a subset of its frames.
+
+    The filters run on every `subsample_step`-th frame (and the last one). Between two
+    samples with the same decision, the decision is assumed to hold and the metrics of
+    the earlier sample are carried over. Where the decision flips, the gap is bisected
+    until the boundary is frame-accurate. Samples whose metric lies within
+    `subsample_tolerance` (a fraction of the threshold) of its threshold could flip
+    in between, so their gaps are bisected too: 0 trusts the samples, larger values
+    refine more and approach full evaluation.
+
+    Args:
+        frames (numpy.ndarray): Batch of BGR frames (N, H, W, 3).
+        settings (Mapping): Filter settings, same keys as the `preprocessing` config section.
+
+    Returns:
+        dict: 'quality', 'brightness' and 'noise' float arrays of shape (N,), NaN when the filter is disabled.
+    """
+    num_frames = len(frames)
+    step = settings.get("subsample_step", 1)
+    tolerance = settings.get("subsample_tolerance", 0.0)
+    frame_settings = dict(settings, motion_bool=False, stabilize_bool=False, subsample_step=1)
+
+    metrics = {name: np.full(num_frames, np.nan) for name in SUBSAMPLED_FILTERS}
+    evaluated = np.zeros(num_frames, dtype=bool)
+
+    def evaluate(indices):
+        sample_metrics, _ = score_batch(frames[indices], frame_settings)
+        for name in SUBSAMPLED_FILTERS:
+            metrics[name][indices] = sample_metrics[name]
+        evaluated[indices] = True
+
+    samples = np.union1d(np.arange(0, num_frames, step), [num_frames - 1])
+    evaluate(samples)
+    gaps = [(start, end) for start, end in zip(samples[:-1], samples[1:]) if end - start > 1]
+
+    while gaps:
+        _, reasons = apply_thresholds(metrics, frame_settings)
+        near_threshold = np.zeros(num_frames, dtype=bool)
+        for name, (enabled_key, threshold_key) in SUBSAMPLED_FILTERS.items():
+            if settings.get(enabled_key, name == "quality"):
+                threshold = settings[threshold_key]
+                near_threshold |= np.abs(metrics[name] - threshold) < tolerance * abs(threshold)
+
+        # Bisect every gap whose ends disagree (or could), one batched evaluation per round
+        gaps = [(start, end) for start, end in gaps
+                if reasons[start] != reasons[end] or near_threshold[start] or near_threshold[end]]
+        if not gaps:
+            break
+        midpoints = np.array([(start + end) // 2 for start, end in gaps])
+        evaluate(midpoints)
+        gaps = [gap for (start, end), mid in zip(gaps, midpoints) for gap in ((start, mid), (mid, end)) if gap[1] - gap[0] > 1]
+
+    # Frames that weren't evaluated take the metrics of the last evaluated frame before them
+    last_evaluated = np.maximum.accumulate(np.where(evaluated, np.arange(num_frames), 0))
+    return {name: values[last_evaluated] for name, values in metrics.items()}
+
+def score_batches(batches, settings):
+    """
+    Score a stream of frame batches, carrying the motion state from one batch to the next.
+
+    Args:
+        batches (Iterable): Batches of BGR frames (N, H, W, 3), in frame order.
+        settings (Mapping): Filter settings, same keys as the `preprocessing` config section.
+
+    Yields:
+        tuple: (frames, keep_mask, reasons, transforms) for each batch. `transforms` is the
+            global motion of every frame with `stabilize_bool`, None otherwise.
+    """
+    motion_state = None
+    for frames in batches:
+        metrics, motion_state = score_batch(frames, settings, motion_state)
+        keep_mask, reasons = apply_thresholds(metrics, settings)
+        yield frames, keep_mask, reasons, metrics["transform"]
+
+def score_video(cap, settings, batch_size=16):
+    """
+    Score a whole video batch by batch.
+
+    Args:
+        cap (cv2.VideoCapture): Opened video capture.
+        settings (Mapping): Filter settings, same keys as the `preprocessing` config section.
+        batch_size (int): Number of frames decoded and scored together.
+
+    Returns:
+        Iterator: (frames, keep_mask, reasons, transforms) for each batch (see score_batches).
+    """
+    return score_batches(read_batches(cap, batch_size), settings)
@@ -0,0 +1,274 @@
+import cv2
+import time
+import tracemalloc
+import argparse
+import numpy as np
+from omegaconf import OmegaConf
+
+from scenedetect import VideoManager, SceneManager
+from scenedetect.detectors import ContentDetector
+
+from batch_scoring import read_batches, score_batches
+from classifier_backends import agreement, load_backend, predict_batches
+from export_classifier import clip_frames
+from scene_detection import detect_scenes_coarse_to_fine, detect_scenes_native
+
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def load_frames(video_path, max_frames):
+    """
+    Decode the first frames of a video into memory, so benchmarks measure analysis rather than decoding.
+
+    Args:
+        video_path (str): Path to the video.
+        max_frames (int): Number of frames to decode.
+
+    Returns:
+        list: Batches of frames as produced by read_batches.
+    """
+    cap = cv2.VideoCapture(video_path)
+    batches = list(read_batches(cap, 16, max_frames))
+    cap.release()
+    return batches
+
+def run_analysis(batches, settings):
+    """
+    Score preloaded batches with the given settings.
+
+    Returns:
+        numpy.ndarray: Reason bitmask of every frame.
+    """
+    return np.concatenate([reasons for _, _, reasons, _ in score_batches(batches, settings)])
+
+def benchmark_proxy(config, scales, max_frames):
+    """
+    Compare analysis speed, peak memory and keep/drop agreement across analysis scales.
+
+    Every filter is enabled. Peak memory is the peak of Python-tracked allocations
+    (numpy and OpenCV output arrays) during the analysis, measured in a separate run
+    so tracing doesn't skew the timings.
+
+    Args:
+        config (DictConfig): Loaded configuration.
+        scales (list): Analysis scales to compare; the first one is the reference.
+        max_frames (int): Number of frames to analyze.
+    """
+    batches = load_frames(config.path.data.input, max_frames)
+    num_frames = sum(len(frames) for frames in batches)
+    height, width = batches[0].shape[1:3]
+    logger.info(f"🔥 Proxy benchmark on {num_frames} frames of {width}x{height}.")
+
+    reference = None
+    for scale in scales:
+        settings = dict(OmegaConf.to_container(config.preprocessing),
+                        quality_bool=True, brightness_bool=True, motion_bool=True, noise_bool=True,
+                        analysis_scale=scale)
+
+        start = time.perf_counter()
+        reasons = run_analysis(batches, settings)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        run_analysis(batches, settings)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        if reference is None:
+            reference = reasons
+        agreement = np.mean((reasons == 0) == (reference == 0)) * 100
+
+        print(f"scale {scale:<5g} {num_frames / elapsed:8.1f} fps  {elapsed:7.2f} s  "
+              f"peak {peak / 2 ** 20:8.1f} MiB  keep/drop agreement {agreement:6.2f}%")
+
+def benchmark_motion(config, max_frames):
+    """
+    Compare the dense optical-flow and the sparse feature-tracking motion filters.
+
+    Args:
+        config (DictConfig): Loaded configuration.
+        max_frames (int): Number of frames to analyze.
+    """
+    batches = load_frames(config.path.data.input, max_frames)
+    num_frames = sum(len(frames) for frames in batches)
+    height, width = batches[0].shape[1:3]
+    logger.info(f"🔥 Motion benchmark on {num_frames} frames of {width}x{height}.")
+
+    for motion_method in ("dense", "sparse"):
+        settings = dict(OmegaConf.to_container(config.preprocessing),
+                        quality_bool=False, brightness_bool=False, motion_bool=True, noise_bool=False,
+                        motion_method=motion_method)
+
+        start = time.perf_counter()
+        reasons = run_analysis(batches, settings)
+        elapsed = time.perf_counter() - start
+
+        print(f"{motion_method:<6} {num_frames / elapsed:8.1f} fps  {elapsed:7.2f} s  "
+              f"shaky frames {int((reasons != 0).sum())}")
+
+def benchmark_subsample(config, steps, max_frames):
+    """
+    Compare subsampled quality, brightness and noise filtering with full evaluation.
+
+    Args:
+        config (DictConfig): Loaded configuration.
+        steps (list): Subsampling steps to compare; the full evaluation (step 1) is the reference.
+        max_frames (int): Number of frames to analyze.
+    """
+    batches = load_frames(config.path.data.input, max_frames)
+    num_frames = sum(len(frames) for frames in batches)
+    logger.info(f"🔥 Subsampling benchmark on {num_frames} frames.")
+
+    reference = None
+    for step in [1] + [step for step in steps if step > 1]:
+        settings = dict(OmegaConf.to_container(config.preprocessing),
+                        quality_bool=True, brightness_bool=True, motion_bool=False, noise_bool=True,
+                        subsample_step=step)
+        # Regroup the frames so every batch spans a few sampling steps, as preprocessing does
+        frames = np.concatenate(batches)
+        batch_size = max(settings["batch_size"], 4 * step)
+        step_batches = [frames[i:i + batch_size] for i in range(0, num_frames, batch_size)]
+
+        start = time.perf_counter()
+        reasons = np.concatenate([reasons for _, _, reasons, _ in score_batches(step_batches, settings)])
+        elapsed = time.perf_counter() - start
+
+        if reference is None:
+            reference = reasons
+        mismatches = int(((reasons == 0) != (reference == 0)).sum())
+        print(f"step {step:<4d} {num_frames / elapsed:8.1f} fps  {elapsed:7.2f} s  "
+              f"keep/drop mismatches {mismatches} ({mismatches / num_frames * 100:.2f}%)")
+
+def pyscenedetect_cuts(video_path, threshold, min_scene_len):
+    """
+    Cut frames found by the PySceneDetect path (VideoManager + ContentDetector with default downscaling).
+    """
+    video_manager = VideoManager([video_path])
+    scene_manager = SceneManager()
+    scene_manager.add_detector(ContentDetector(threshold, min_scene_len))
+    video_manager.set_downscale_factor()
+    video_manager.start()
+    scene_manager.detect_scenes(frame_source=video_manager)
+    scene_list = scene_manager.get_scene_list()
+    video_manager.release()
+    return [start.get_frames() for start, _ in scene_list[1:]]
+
+def native_cuts(video_path, threshold, min_scene_len, frame_skip, batch_size):
+    """
+    Cut frames found by scene_detection.detect_scenes_native.
+    """
+    cap = cv2.VideoCapture(video_path)
+    scene_list = detect_scenes_native(cap, threshold, min_scene_len, frame_skip, batch_size)
+    cap.release()
+    return [start.get_frames() for start, _ in scene_list[1:]]
+
+def coarse_to_fine_cuts(video_path, threshold, min_scene_len, coarse_step, candidate_ratio, batch_size):
+    """
+    Cut frames found by scene_detection.detect_scenes_coarse_to_fine.
+    """
+    cap = cv2.VideoCapture(video_path)
+    scene_list = detect_scenes_coarse_to_fine(cap, threshold, min_scene_len, coarse_step, candidate_ratio, batch_size)
+    cap.release()
+    return [start.get_frames() for start, _ in scene_list[1:]]
+
+def benchmark_scenes(config, frame_skips):
+    """
+    Compare the native and coarse-to-fine scene detectors with the PySceneDetect path on the input video.
+
+    All runs include decoding. Agreement counts the cuts of each native run that match a
+    PySceneDetect cut exactly, and within frame_skip + 1 frames.
+
+    Args:
+        config (DictConfig): Loaded configuration.
+        frame_skips (list): Frame skips to run the native detector with.
+    """
+    video_path = config.path.data.input
+    detection = config.timeline
+    cap = cv2.VideoCapture(video_path)
+    num_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    logger.info(f"🔥 Scene detection benchmark on {num_frames} frames.")
+
+    start = time.perf_counter()
+    reference = pyscenedetect_cuts(video_path, detection.threshold, detection.min_scene_len)
+    elapsed = time.perf_counter() - start
+    print(f"pyscenedetect        {num_frames / elapsed:8.1f} fps  {elapsed:7.2f} s  cuts {len(reference)}")
+
+    for frame_skip in frame_skips:
+        start = time.perf_counter()
+        cuts = native_cuts(video_path, detection.threshold, detection.min_scene_len, frame_skip, detection.batch_size)
+        elapsed = time.perf_counter() - start
+
+        exact = len(set(cuts) & set(reference))
+        near = sum(any(abs(cut - ref) <= frame_skip + 1 for ref in reference) for cut in cuts)
+        print(f"native skip {frame_skip:<8d} {num_frames / elapsed:8.1f} fps  {elapsed:7.2f} s  cuts {len(cuts)}  "
+              f"exact {exact}/{len(reference)}  within {frame_skip + 1} frames {near}/{len(cuts)}")
+
+    start = time.perf_counter()
+    cuts = coarse_to_fine_cuts(video_path, detection.threshold, detection.min_scene_len, detection.coarse_step,
+                               detection.candidate_ratio, detection.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"coarse step {detection.coarse_step:<8d} {num_frames / elapsed:8.1f} fps  {elapsed:7.2f} s  cuts {len(cuts)}  "
+          f"identical to pyscenedetect: {cuts == reference}")
+
+def benchmark_classifier(config, backends, batch_sizes):
+    """
+    Compare latency, throughput and category agreement of the classifier backends on the held-out clips.
+
+    Every backend is warmed up with one batch before timing. Agreement is measured against
+    the first backend.
+
+    Args:
+        config (DictConfig): Loaded configuration.
+        backends (list): Backends to compare ('keras', 'tflite', 'onnx'); the first one is the reference.
+        batch_sizes (list): Batch sizes to time every backend with.
+    """
+    category = config.category
+    model_paths = {"tflite": category.tflite_path, "onnx": category.onnx_path}
+    frames = clip_frames(category.holdout_dir, category.frames_per_clip, seed=1)
+    logger.info(f"🔥 Classifier benchmark on {len(frames)} held-out frames.")
+
+    reference = None
+    for backend_name in backends:
+        start = time.perf_counter()
+        backend = load_backend(backend_name, model_paths.get(backend_name))
+        load_time = time.perf_counter() - start
+
+        for batch_size in batch_sizes:
+            predict_batches(backend, frames[:batch_size], batch_size)
+            start = time.perf_counter()
+            probabilities = predict_batches(backend, frames, batch_size)
+            elapsed = time.perf_counter() - start
+
+            if reference is None:
+                reference = probabilities
+            result = agreement(reference, probabilities)
+            num_batches = -(-len(frames) // batch_size)
+            print(f"{backend_name:<6} batch {batch_size:<4d} load {load_time:6.2f} s  "
+                  f"{elapsed / num_batches * 1000:8.1f} ms/batch  {len(frames) / elapsed:7.1f} frames/s  "
+                  f"category agreement {result['category'] * 100:6.2f}%  top-1 {result['top1'] * 100:6.2f}%")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", "-c", type=str, default="base_config")
+    parser.add_argument("--task", "-t", type=str, default="proxy", choices=["proxy", "motion", "subsample", "scenes", "classifier"])
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0, 0.5, 0.25])
+    parser.add_argument("--steps", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--frame-skips", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--backends", type=str, nargs="+", default=["keras", "tflite", "onnx"])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--max-frames", type=int, default=300)
+    args, _ = parser.parse_known_args()
+
+    config = OmegaConf.load(f"../config/{args.config}.yaml")
+    if args.task == "proxy":
+        benchmark_proxy(config, args.scales, args.max_frames)
+    elif args.task == "motion":
+        benchmark_motion(config, args.max_frames)
+    elif args.task == "subsample":
+        benchmark_subsample(config, args.steps, args.max_frames)
+    elif args.task == "scenes":
+        benchmark_scenes(config, args.frame_skips)
+    elif args.task == "classifier":
+        benchmark_classifier(config, args.backends, args.batch_sizes)
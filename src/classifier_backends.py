@@ -0,0 +1,172 @@
+import numpy as np
+
+# InceptionV3 input resolution
+INPUT_SIZE = 299
+
+# ImageNet class indices of the categories we detect (hamster, neck brace, rugby ball, hotdog)
+IMAGENET_CATEGORIES = {333: 'Animal', 678: 'Beauty', 768: 'Sports', 934: 'Food'}
+
+def preprocess(frames):
+    """
+    Scale RGB frames to InceptionV3's input range, like keras' inception_v3.preprocess_input.
+
+    Args:
+        frames (numpy.ndarray): (N, 299, 299, 3) uint8 RGB frames.
+
+    Returns:
+        numpy.ndarray: float32 batch in [-1, 1].
+    """
+    return frames.astype(np.float32) / 127.5 - 1.0
+
+def top_categories(probabilities):
+    """
+    Category of every frame from its class probabilities (top-1 ImageNet class).
+
+    Args:
+        probabilities (numpy.ndarray): (N, 1000) class probabilities.
+
+    Returns:
+        list: Category of every frame, 'Unknown' when the top class isn't one we detect.
+    """
+    return [IMAGENET_CATEGORIES.get(int(index), 'Unknown') for index in np.argmax(probabilities, axis=1)]
+
+class KerasBackend:
+    """
+    Full-precision InceptionV3 run by TensorFlow, pre-trained on ImageNet.
+
+    TensorFlow is imported when the backend is created, not when this module is imported.
+    """
+
+    def __init__(self, model_path=None):
+        from tensorflow.keras.applications.inception_v3 import InceptionV3
+        self.model = InceptionV3(weights='imagenet')
+
+    def predict(self, batch):
+        """
+        Class probabilities of a preprocessed batch.
+
+        Args:
+            batch (numpy.ndarray): (N, 299, 299, 3) float32 batch (see preprocess).
+
+        Returns:
+            numpy.ndarray: (N, 1000) class probabilities.
+        """
+        return np.asarray(self.model.predict_on_batch(batch))
+
+class TFLiteBackend:
+    """
+    Exported (float16 or int8 quantized) InceptionV3 run by the TFLite interpreter.
+
+    The standalone tflite_runtime package is used when installed, so serving doesn't
+    import TensorFlow; tf.lite is the fallback. Quantized inputs and outputs are
+    (de)quantized with the scale and zero point stored in the model.
+
+    Args:
+        model_path (str): Path to the .tflite model (see export_classifier.py).
+        num_threads (int, optional): Interpreter threads. Defaults to the runtime's choice.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = None
+
+    def predict(self, batch):
+        """Class probabilities of a preprocessed batch (see KerasBackend.predict)."""
+        if len(batch) != self.batch_size:
+            # The exported model has a fixed batch dimension; resize it to this batch
+            self.interpreter.resize_tensor_input(self.input['index'], [len(batch), INPUT_SIZE, INPUT_SIZE, 3])
+            self.interpreter.allocate_tensors()
+            self.batch_size = len(batch)
+
+        if self.input['dtype'] != np.float32:
+            scale, zero_point = self.input['quantization']
+            info = np.iinfo(self.input['dtype'])
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(self.input['dtype'])
+        self.interpreter.set_tensor(self.input['index'], batch)
+        self.interpreter.invoke()
+
+        probabilities = self.interpreter.get_tensor(self.output['index'])
+        if self.output['dtype'] != np.float32:
+            scale, zero_point = self.output['quantization']
+            probabilities = (probabilities.astype(np.float32) - zero_point) * scale
+        return probabilities
+
+class OnnxBackend:
+    """
+    Exported (optionally int8 quantized) InceptionV3 run by ONNX Runtime on the CPU.
+
+    Args:
+        model_path (str): Path to the .onnx model (see export_classifier.py).
+        num_threads (int, optional): Intra-op threads. Defaults to the runtime's choice.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        """Class probabilities of a preprocessed batch (see KerasBackend.predict)."""
+        return self.session.run(None, {self.input_name: batch})[0]
+
+BACKENDS = {"keras": KerasBackend, "tflite": TFLiteBackend, "onnx": OnnxBackend}
+
+def load_backend(name, model_path=None):
+    """
+    Create a classifier backend.
+
+    Args:
+        name (str): 'keras', 'tflite' or 'onnx'.
+        model_path (str, optional): Exported model, for the 'tflite' and 'onnx' backends.
+
+    Returns:
+        Backend with a predict(batch) method returning class probabilities.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown classifier backend: {name}. Choose from {', '.join(BACKENDS)}.")
+    return BACKENDS[name](model_path)
+
+def predict_batches(backend, frames, batch_size=32):
+    """
+    Class probabilities of frames, one forward pass per batch.
+
+    Args:
+        backend: Backend created with load_backend.
+        frames (numpy.ndarray): (N, 299, 299, 3) uint8 RGB frames.
+        batch_size (int): Number of frames per forward pass.
+
+    Returns:
+        numpy.ndarray: (N, 1000) class probabilities.
+    """
+    # Converted to float per batch, so sampling many frames doesn't hold them all as float32
+    probabilities = [backend.predict(preprocess(frames[start:start + batch_size])) for start in range(0, len(frames), batch_size)]
+    return np.concatenate(probabilities) if probabilities else np.empty((0, 1000), dtype=np.float32)
+
+def agreement(reference, candidate):
+    """
+    How often a backend agrees with a reference backend on the same frames.
+
+    Args:
+        reference (numpy.ndarray): (N, 1000) class probabilities of the reference backend.
+        candidate (numpy.ndarray): (N, 1000) class probabilities of the compared backend.
+
+    Returns:
+        dict: 'top1' (share of frames with the same top ImageNet class), 'category' (share
+            with the same detected category) and 'max_abs_diff' (largest probability difference).
+    """
+    same_class = np.argmax(reference, axis=1) == np.argmax(candidate, axis=1)
+    same_category = np.array(top_categories(reference)) == np.array(top_categories(candidate))
+    return {
+        "top1": float(same_class.mean()) if len(same_class) else 1.0,
+        "category": float(same_category.mean()) if len(same_category) else 1.0,
+        "max_abs_diff": float(np.abs(reference - candidate).max()) if len(reference) else 0.0,
+    }
@@ -0,0 +1,69 @@
+import cv2
+
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def extract_clips(cap, clips, frame_rate, frame_size, first_frame=0):
+    """
+    Write any number of clips of a video in a single front-to-back pass.
+
+    The video is never seeked: frames no clip needs are skipped with grab() (no color
+    conversion), and every decoded frame is written to each open clip covering it, so
+    overlapping clips share the decode and 50 clips cost about one decode of the video.
+
+    Args:
+        cap (cv2.VideoCapture or EdlReader): Opened reader of the video, positioned at `first_frame`.
+        clips (Iterable): (start_frame, end_frame, clip_path) of every clip, end excluded, sorted
+            by start frame. May be a generator still producing later clips while earlier ones are written.
+        frame_rate (float): Frame rate of the clips.
+        frame_size (tuple): (width, height) of the frames.
+        first_frame (int): Index of the frame the reader returns next. No clip may start before it.
+
+    Yields:
+        str: Path of every clip once it is complete, in order of end frame.
+    """
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    clips = iter(clips)
+    next_clip = next(clips, None)
+    open_clips = []  # [end_frame, clip_path, writer] of the clips covering the current frame
+    position = first_frame  # Index of the next frame the capture returns
+
+    while next_clip is not None or open_clips:
+        # Open every clip starting at this frame
+        while next_clip is not None and next_clip[0] <= position:
+            start_frame, end_frame, clip_path = next_clip
+            if start_frame < position:
+                raise ValueError(f"Clips must be sorted by start frame: {clip_path} starts at {start_frame}, after frame {position} was read")
+            open_clips.append([end_frame, clip_path, cv2.VideoWriter(clip_path, fourcc, frame_rate, frame_size)])
+            next_clip = next(clips, None)
+
+        # Finish the clips that end here (including empty ones)
+        for clip in [clip for clip in open_clips if clip[0] <= position]:
+            open_clips.remove(clip)
+            clip[2].release()
+            yield clip[1]
+        if not open_clips and next_clip is None:
+            break
+
+        if open_clips:
+            ret, frame = cap.read()
+            if ret:
+                for clip in open_clips:
+                    clip[2].write(frame)
+        else:
+            # Between clips, frames are skipped without color conversion
+            ret = cap.grab()
+        if not ret:
+            logger.warning(f"Reached the end of the video at frame {position}; the remaining clips are truncated.")
+            for clip in open_clips:
+                clip[2].release()
+                yield clip[1]
+            open_clips = []
+            # Later clips start past the end of the video and stay empty
+            while next_clip is not None:
+                cv2.VideoWriter(next_clip[2], fourcc, frame_rate, frame_size).release()
+                yield next_clip[2]
+                next_clip = next(clips, None)
+            break
+        position += 1
@@ -0,0 +1,178 @@
+import cv2
+import json
+import os
+import numpy as np
+
+EDL_SUFFIX = ".edl.json"
+
+# Beyond this many frames, seeking is cheaper than grabbing our way to the next kept range
+SEEK_THRESHOLD = 120
+
+def keep_mask_to_ranges(keep_mask):
+    """
+    Convert a per-frame keep-mask into the kept frame ranges.
+
+    Args:
+        keep_mask (numpy.ndarray): Boolean array, one entry per source frame.
+
+    Returns:
+        numpy.ndarray: (K, 2) int64 array of [start, end) source frame ranges, in order.
+    """
+    padded = np.concatenate([[False], np.asarray(keep_mask, dtype=bool), [False]])
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges.reshape(-1, 2).astype(np.int64)
+
+class EditDecisionList:
+    """
+    Kept frame ranges over a source video, standing in for a re-encoded preprocessed video.
+
+    The virtual video made of the kept frames is addressed by "virtual" frame indices;
+    to_source maps them back to frames of the source file.
+
+    Args:
+        source_path (str): Path to the source video.
+        fps (float): Frame rate of the source video.
+        ranges (numpy.ndarray): (K, 2) array of [start, end) kept source frame ranges.
+    """
+
+    def __init__(self, source_path, fps, ranges):
+        self.source_path = source_path
+        self.fps = fps
+        self.ranges = np.asarray(ranges, dtype=np.int64).reshape(-1, 2)
+        # Virtual index of the first frame of every range
+        self._range_offsets = np.concatenate([[0], np.cumsum(self.ranges[:, 1] - self.ranges[:, 0])])
+
+    @classmethod
+    def from_keep_mask(cls, source_path, fps, keep_mask):
+        """Build the list from a per-frame keep-mask of the source video."""
+        return cls(source_path, fps, keep_mask_to_ranges(keep_mask))
+
+    @classmethod
+    def load(cls, edl_path):
+        """Load a list saved with save()."""
+        with open(edl_path, 'r') as f:
+            data = json.load(f)
+        return cls(data["source"], data["fps"], data["ranges"])
+
+    def save(self, edl_path):
+        """Save the list as JSON."""
+        with open(edl_path, 'w') as f:
+            json.dump({"source": os.path.abspath(self.source_path), "fps": self.fps, "ranges": self.ranges.tolist()}, f)
+
+    @property
+    def num_frames(self):
+        """int: Number of frames of the virtual video."""
+        return int(self._range_offsets[-1])
+
+    def to_source(self, virtual_index):
+        """
+        Map a frame of the virtual video to the source frame it comes from.
+
+        Args:
+            virtual_index (int): Frame index in the virtual video.
+
+        Returns:
+            int: Frame index in the source video.
+        """
+        range_index = np.searchsorted(self._range_offsets, virtual_index, side='right') - 1
+        return int(self.ranges[range_index, 0] + virtual_index - self._range_offsets[range_index])
+
+class EdlReader:
+    """
+    Read the virtual video of an EditDecisionList frame by frame from its source.
+
+    Implements the subset of the cv2.VideoCapture interface used in this project
+    (read, grab, get, set of CAP_PROP_POS_FRAMES, isOpened, release), so it can be used
+    wherever a capture of the preprocessed video was used. Excluded frames are
+    skipped with grab() (no color conversion) or, for long gaps, with a seek.
+
+    Args:
+        edl (EditDecisionList): List to read.
+    """
+
+    def __init__(self, edl):
+        self.edl = edl
+        self._cap = cv2.VideoCapture(edl.source_path)
+        self._position = 0  # Virtual index of the next frame to read
+        self._source_position = 0  # Source index of the next frame the capture will decode
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def _seek_source(self):
+        # Bring the source capture to the frame behind the current virtual position
+        target = self.edl.to_source(self._position)
+        if target < self._source_position or target - self._source_position > SEEK_THRESHOLD:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            self._source_position = target
+        while self._source_position < target:
+            self._cap.grab()
+            self._source_position += 1
+
+    def read(self):
+        if self._position >= self.edl.num_frames:
+            return False, None
+
+        self._seek_source()
+        ret, frame = self._cap.read()
+        if ret:
+            self._source_position += 1
+            self._position += 1
+        return ret, frame
+
+    def grab(self):
+        if self._position >= self.edl.num_frames:
+            return False
+
+        self._seek_source()
+        ret = self._cap.grab()
+        if ret:
+            self._source_position += 1
+            self._position += 1
+        return ret
+
+    def get(self, prop_id):
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self.edl.fps
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return self.edl.num_frames
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return self._position
+        return self._cap.get(prop_id)
+
+    def set(self, prop_id, value):
+        if prop_id != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        self._position = int(value)
+        return True
+
+    def release(self):
+        self._cap.release()
+
+def open_video(video_path):
+    """
+    Open either a video file or an edit-decision list of kept frames over one.
+
+    Args:
+        video_path (str): Path to a video, or to a file ending in EDL_SUFFIX.
+
+    Returns:
+        cv2.VideoCapture or EdlReader: Reader with the cv2.VideoCapture interface.
+    """
+    if video_path.endswith(EDL_SUFFIX):
+        return EdlReader(EditDecisionList.load(video_path))
+    return cv2.VideoCapture(video_path)
+
+def preprocessed_video_path(config):
+    """
+    Where downstream stages find the preprocessing result.
+
+    Args:
+        config (DictConfig): Loaded configuration.
+
+    Returns:
+        str: The re-encoded video, or the edit-decision list when preprocessing doesn't materialize its output.
+    """
+    if config.preprocessing.materialize:
+        return config.path.data.preprocessing_output
+    return config.path.data.preprocessing_edl
@@ -0,0 +1,123 @@
+import json
+import numpy as np
+
+from batch_scoring import describe_reasons
+
+class ExclusionLog:
+    """
+    Excluded frames of a video, stored as sorted runs of consecutive frames sharing a reason bitmask.
+
+    A run covers frames [start, end). Runs never overlap, so looking up why a frame was
+    dropped is a binary search over the run starts.
+
+    Saved as JSON lines: a header line with the frame rate and frame count, then one line
+    per run, e.g. {"start": 90, "end": 136, "reasons": 2}.
+
+    Args:
+        fps (float): Frame rate of the video.
+        frame_count (int): Number of frames of the video.
+        starts (numpy.ndarray): First frame of every run.
+        ends (numpy.ndarray): Frame after the last frame of every run.
+        masks (numpy.ndarray): Reason bitmask of every run (see batch_scoring.REASON_LABELS).
+    """
+
+    def __init__(self, fps, frame_count, starts, ends, masks):
+        self.fps = fps
+        self.frame_count = frame_count
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.masks = np.asarray(masks, dtype=np.uint8)
+        # Run boundaries in seconds, computed once so looking up a time stays a binary search
+        self.start_times = self.starts / fps
+        self.end_times = self.ends / fps
+
+    @classmethod
+    def from_reasons(cls, reasons, fps):
+        """
+        Coalesce per-frame reason bitmasks into runs.
+
+        Args:
+            reasons (numpy.ndarray): Reason bitmask of every frame, 0 for kept frames.
+            fps (float): Frame rate of the video.
+
+        Returns:
+            ExclusionLog: The runs of excluded frames.
+        """
+        reasons = np.asarray(reasons, dtype=np.uint8)
+        # A run starts wherever the bitmask changes
+        boundaries = np.flatnonzero(np.diff(reasons)) + 1
+        starts = np.concatenate([[0], boundaries]) if len(reasons) else np.empty(0, dtype=np.int64)
+        ends = np.concatenate([boundaries, [len(reasons)]]) if len(reasons) else np.empty(0, dtype=np.int64)
+        masks = reasons[starts]
+        excluded = masks != 0
+        return cls(fps, len(reasons), starts[excluded], ends[excluded], masks[excluded])
+
+    @classmethod
+    def load(cls, log_file_path):
+        """Load a log saved with save()."""
+        with open(log_file_path, 'r') as f:
+            header = json.loads(f.readline())
+            runs = [json.loads(line) for line in f if line.strip()]
+        return cls(header["fps"], header["frame_count"],
+                   [run["start"] for run in runs], [run["end"] for run in runs], [run["reasons"] for run in runs])
+
+    def save(self, log_file_path):
+        """Save the log as JSON lines."""
+        with open(log_file_path, 'w') as f:
+            f.write(json.dumps({"fps": self.fps, "frame_count": self.frame_count}) + "\n")
+            for start, end, mask in zip(self.starts.tolist(), self.ends.tolist(), self.masks.tolist()):
+                f.write(json.dumps({"start": start, "end": end, "reasons": mask}) + "\n")
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def excluded_frames(self):
+        """int: Total number of excluded frames."""
+        return int((self.ends - self.starts).sum())
+
+    def reason_mask(self, frame_index):
+        """
+        Why a frame was excluded.
+
+        Args:
+            frame_index (int): Frame of the video.
+
+        Returns:
+            int: Reason bitmask of the frame, 0 if it was kept.
+        """
+        run = np.searchsorted(self.starts, frame_index, side='right') - 1
+        if run < 0 or frame_index >= self.ends[run]:
+            return 0
+        return int(self.masks[run])
+
+    def reasons_at(self, time):
+        """
+        Why the frame shown at a given time was excluded.
+
+        The time is compared with the run boundaries in seconds rather than turned into a
+        frame number: int(time * fps) truncates a boundary like 1001 / 29.97 to the frame
+        before it.
+
+        Args:
+            time (float): Time in seconds.
+
+        Returns:
+            list: Reason labels, empty if the frame was kept.
+        """
+        run = np.searchsorted(self.start_times, time, side='right') - 1
+        if run < 0 or time >= self.end_times[run]:
+            return []
+        return describe_reasons(self.masks[run])
+
+    def to_text(self):
+        """
+        Human-readable summary, one line per run.
+
+        Returns:
+            str: The runs with their time range and reasons.
+        """
+        return "".join(
+            f"Deleted frames from {start / self.fps:.2f} to {end / self.fps:.2f} seconds. Reasons: {', '.join(describe_reasons(mask))}\n"
+            for start, end, mask in zip(self.starts.tolist(), self.ends.tolist(), self.masks.tolist())
+        )
@@ -0,0 +1,187 @@
+import cv2
+import os
+import sys
+import argparse
+import tempfile
+import numpy as np
+from omegaconf import OmegaConf
+
+from classifier_backends import INPUT_SIZE, KerasBackend, agreement, load_backend, preprocess, predict_batches
+from frame_sampler import read_frames, sample_indices
+
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov")
+
+def clip_frames(clip_dir, frames_per_clip, seed=0):
+    """
+    Sample frames from every clip of a directory, resized to the classifier input.
+
+    Args:
+        clip_dir (str): Directory holding the clips.
+        frames_per_clip (int): Number of frames sampled per clip.
+        seed (int): Seed of the frame sampling, so runs use the same frames.
+
+    Returns:
+        numpy.ndarray: (N, 299, 299, 3) uint8 RGB frames.
+    """
+    frames = []
+    for name in sorted(os.listdir(clip_dir)):
+        if not name.lower().endswith(VIDEO_EXTENSIONS):
+            continue
+        cap = cv2.VideoCapture(os.path.join(clip_dir, name))
+        frame_indices = sample_indices(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), frames_per_clip, seed)
+        for _, frame in read_frames(cap, frame_indices):
+            frames.append(cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), (INPUT_SIZE, INPUT_SIZE)))
+        cap.release()
+    return np.stack(frames) if frames else np.empty((0, INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
+
+def export_tflite(model, output_path, quantization, calibration_frames):
+    """
+    Convert the Keras model to TFLite.
+
+    Args:
+        model (tensorflow.keras.Model): Full-precision model.
+        output_path (str): Path of the .tflite model.
+        quantization (str): 'float16' (half-precision weights), 'int8' (integer weights and
+            activations, calibrated on `calibration_frames`) or 'none'.
+        calibration_frames (numpy.ndarray): uint8 RGB frames for int8 calibration.
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantization == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+        def representative_dataset():
+            for frame in calibration_frames:
+                yield [preprocess(frame[np.newaxis])]
+        converter.representative_dataset = representative_dataset
+
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+
+def export_onnx(model, output_path, quantization, calibration_frames):
+    """
+    Convert the Keras model to ONNX.
+
+    Args:
+        model (tensorflow.keras.Model): Full-precision model.
+        output_path (str): Path of the .onnx model.
+        quantization (str): 'int8' (static QDQ quantization calibrated on `calibration_frames`)
+            or 'none'. ONNX Runtime has no float16 CPU kernels worth using, so 'float16' exports unquantized.
+        calibration_frames (numpy.ndarray): uint8 RGB frames for int8 calibration.
+    """
+    import tensorflow as tf
+    import tf2onnx
+
+    input_signature = (tf.TensorSpec((None, INPUT_SIZE, INPUT_SIZE, 3), tf.float32, name="input"),)
+    if quantization != "int8":
+        tf2onnx.convert.from_keras(model, input_signature=input_signature, opset=13, output_path=output_path)
+        return
+
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self.frames = iter(calibration_frames)
+
+        def get_next(self):
+            frame = next(self.frames, None)
+            return None if frame is None else {"input": preprocess(frame[np.newaxis])}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        float_path = os.path.join(temp_dir, "float.onnx")
+        tf2onnx.convert.from_keras(model, input_signature=input_signature, opset=13, output_path=float_path)
+        quantize_static(float_path, output_path, FrameReader(), quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+def check_parity(reference, backend_name, model_path, holdout_frames, batch_size, min_agreement):
+    """
+    Compare an exported model with the Keras model on held-out frames.
+
+    Args:
+        reference (numpy.ndarray): Class probabilities of the Keras model on the frames.
+        backend_name (str): 'tflite' or 'onnx'.
+        model_path (str): Path of the exported model.
+        holdout_frames (numpy.ndarray): uint8 RGB frames never used for calibration.
+        batch_size (int): Number of frames per forward pass.
+        min_agreement (float): Share of frames that must get the same category as with Keras.
+
+    Returns:
+        bool: True if the exported model agrees often enough.
+    """
+    candidate = predict_batches(load_backend(backend_name, model_path), holdout_frames, batch_size)
+    result = agreement(reference, candidate)
+    logger.info(f"{backend_name} parity on {len(holdout_frames)} held-out frames: top-1 class {result['top1']:.1%}, "
+                f"category {result['category']:.1%}, max probability difference {result['max_abs_diff']:.4f}")
+    if result["category"] < min_agreement:
+        logger.error(f"{backend_name} agrees with Keras on {result['category']:.1%} of the categories, "
+                     f"below {min_agreement:.0%}.")
+        return False
+    return True
+
+def main(args):
+    """
+    Export the category classifier to quantized TFLite and ONNX models, then check them against Keras.
+
+    Every model is exported to a staging file next to its configured path and only
+    replaces the served model once it passes the parity check; a failing export is
+    deleted and the script exits with status 1.
+
+    Args:
+        args (argparse.Namespace): Command-line arguments.
+    """
+    config = OmegaConf.load(f"../config/{args.config}.yaml")
+    category = config.category
+    output_paths = {"tflite": category.tflite_path, "onnx": category.onnx_path}
+    exporters = {"tflite": export_tflite, "onnx": export_onnx}
+
+    # Calibration and held-out clips are distinct, so parity isn't measured on the data the quantization saw
+    calibration_frames = clip_frames(category.calibration_dir, category.frames_per_clip)
+    holdout_frames = clip_frames(category.holdout_dir, category.frames_per_clip, seed=1)
+    if category.quantization == "int8" and not len(calibration_frames):
+        logger.error(f"No calibration clips found in {category.calibration_dir}; int8 quantization needs some.")
+        sys.exit(1)
+    if not len(holdout_frames):
+        logger.error(f"No held-out clips found in {category.holdout_dir}; exported models can't be checked without them.")
+        sys.exit(1)
+
+    keras_backend = KerasBackend()
+    reference = predict_batches(keras_backend, holdout_frames, category.batch_size)
+
+    failed = []
+    for backend_name in args.formats:
+        output_path = output_paths[backend_name]
+        root, extension = os.path.splitext(output_path)
+        staging_path = f"{root}.staging{extension}"
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        logger.info(f"🔥 Exporting {backend_name} ({category.quantization}) to {staging_path}.")
+        exporters[backend_name](keras_backend.model, staging_path, category.quantization, calibration_frames)
+        logger.info(f"Model size: {os.path.getsize(staging_path) / 2 ** 20:.1f} MiB")
+
+        if check_parity(reference, backend_name, staging_path, holdout_frames, category.batch_size, category.min_agreement):
+            # The app serves whatever model is at output_path, so only a checked model goes there
+            os.replace(staging_path, output_path)
+            logger.info(f"Promoted to {output_path}.")
+        else:
+            os.remove(staging_path)
+            failed.append(backend_name)
+
+    if failed:
+        logger.error(f"Export failed the parity check for: {', '.join(failed)}. The served models are unchanged.")
+        sys.exit(1)
+    logger.info("🔥 Export complete.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", "-c", type=str, default="base_config")
+    parser.add_argument("--formats", type=str, nargs="+", default=["tflite", "onnx"], choices=["tflite", "onnx"])
+    args, _ = parser.parse_known_args()
+    main(args)
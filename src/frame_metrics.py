@@ -0,0 +1,241 @@
+import cv2
+import hashlib
+import json
+import os
+import numpy as np
+
+from batch_scoring import read_batches, score_batch, apply_thresholds
+from pipeline import prefetch
+
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# "transform" is the (N, 3) global camera motion the stabilization follows, not a filter metric
+METRIC_NAMES = ("quality", "brightness", "motion", "noise", "transform")
+
+# Filter switch of every metric; the analysis pass only measures the metrics it is asked for
+METRIC_FILTERS = {"quality": "quality_bool", "brightness": "brightness_bool", "motion": "motion_bool", "noise": "noise_bool",
+                  "transform": "stabilize_bool"}
+
+def enabled_metrics(settings):
+    """
+    Metrics the enabled filters of a settings mapping compare against their thresholds.
+
+    Args:
+        settings (Mapping): Filter settings, same keys as the `preprocessing` config section.
+
+    Returns:
+        tuple: Metric names, in METRIC_NAMES order.
+    """
+    return tuple(name for name in METRIC_NAMES if settings.get(METRIC_FILTERS[name], name == "quality"))
+
+def content_hash(file_path, num_samples=16, sample_size=1 << 20):
+    """
+    Compute a sampled content hash of a file.
+
+    The file size and `num_samples` evenly spaced chunks are hashed, so the cost
+    does not grow with the file size.
+
+    Args:
+        file_path (str): Path to the file.
+        num_samples (int): Number of chunks to hash.
+        sample_size (int): Size of each chunk in bytes.
+
+    Returns:
+        str: Hex digest.
+    """
+    file_size = os.path.getsize(file_path)
+    digest = hashlib.blake2b(str(file_size).encode(), digest_size=16)
+
+    with open(file_path, 'rb') as f:
+        if file_size <= num_samples * sample_size:
+            digest.update(f.read())
+        else:
+            step = (file_size - sample_size) // (num_samples - 1)
+            for i in range(num_samples):
+                f.seek(i * step)
+                digest.update(f.read(sample_size))
+
+    return digest.hexdigest()
+
+def metrics_path(video_path, digest=None, analysis_scale=1.0, motion_method="dense"):
+    """
+    Directory holding the frame-metrics file of a video, next to the video itself.
+
+    Args:
+        video_path (str): Path to the video.
+        digest (str, optional): Content hash of the video. Computed if omitted.
+        analysis_scale (float): Proxy scale the metrics were measured at.
+        motion_method (str): Motion metric the metrics were measured with.
+
+    Returns:
+        str: Path of the metrics directory.
+    """
+    if digest is None:
+        digest = content_hash(video_path)
+    suffix = ""
+    if analysis_scale < 1:
+        suffix += f".x{analysis_scale:g}"
+    if motion_method != "dense":
+        suffix += f".{motion_method}"
+    return f"{video_path}.{digest}{suffix}.metrics"
+
+def analyze_video(video_path, batch_size=16, analysis_scale=1.0, motion_method="dense", metric_names=METRIC_NAMES):
+    """
+    Analysis pass: decode the video once and record raw metrics of every frame.
+
+    The metrics are saved as one .npy column per metric (plus meta.json) next to the
+    video, keyed by the video's content hash. Only `metric_names` are measured, so a
+    quality-only run doesn't pay for optical flow; columns already stored are kept.
+
+    Args:
+        video_path (str): Path to the video.
+        batch_size (int): Number of frames decoded and scored together.
+        analysis_scale (float): Scale of the proxy the metrics are measured on.
+        motion_method (str): 'dense' or 'sparse' motion metric.
+        metric_names (Iterable): Metrics to measure.
+
+    Returns:
+        dict: Metric name -> memory-mapped float64 array, plus 'fps'. None if the video can't be opened.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        logger.warning(f"Unable to load the video. File path: {video_path}")
+        return None
+    fps = cap.get(cv2.CAP_PROP_FPS)
+
+    metric_names = tuple(metric_names)
+    logger.info(f"🔥 Frame analysis starts: {', '.join(metric_names)}.")
+    settings = {METRIC_FILTERS[name]: name in metric_names for name in METRIC_NAMES}
+    settings.update(analysis_scale=analysis_scale, motion_method=motion_method)
+    columns = {name: [] for name in metric_names}
+    frame_count = 0
+    motion_state = None
+    # Decoding runs in its own thread, overlapping with the analysis
+    for frames in prefetch(read_batches(cap, batch_size)):
+        metrics, motion_state = score_batch(frames, settings, motion_state)
+        for name in metric_names:
+            columns[name].append(metrics[name])
+        frame_count += len(frames)
+    cap.release()
+
+    output_dir = metrics_path(video_path, analysis_scale=analysis_scale, motion_method=motion_method)
+    os.makedirs(output_dir, exist_ok=True)
+    for name in metric_names:
+        values = np.concatenate(columns[name]) if columns[name] else np.empty((0, 3) if name == "transform" else 0)
+        np.save(os.path.join(output_dir, f"{name}.npy"), values)
+
+    with open(os.path.join(output_dir, "meta.json"), 'w') as f:
+        json.dump({"fps": fps, "frame_count": frame_count}, f)
+
+    logger.info("🔥 Frame analysis complete.")
+    return load_metrics(video_path, analysis_scale, motion_method, metric_names)
+
+def stored_metrics(video_path, analysis_scale=1.0, motion_method="dense"):
+    """
+    Metrics already recorded for a video.
+
+    Args:
+        video_path (str): Path to the video.
+        analysis_scale (float): Proxy scale the metrics were measured at.
+        motion_method (str): Motion metric the metrics were measured with.
+
+    Returns:
+        tuple: Names of the stored metric columns (empty if the video has not been analyzed).
+    """
+    input_dir = metrics_path(video_path, analysis_scale=analysis_scale, motion_method=motion_method)
+    if not os.path.exists(os.path.join(input_dir, "meta.json")):
+        return ()
+    return tuple(name for name in METRIC_NAMES if os.path.exists(os.path.join(input_dir, f"{name}.npy")))
+
+def load_metrics(video_path, analysis_scale=1.0, motion_method="dense", metric_names=METRIC_NAMES):
+    """
+    Load the frame-metrics file of a video as memory-mapped arrays.
+
+    Args:
+        video_path (str): Path to the video.
+        analysis_scale (float): Proxy scale the metrics were measured at.
+        motion_method (str): Motion metric the metrics were measured with.
+        metric_names (Iterable): Metrics to load. The others are NaN (the transform None), like disabled filters in score_batch.
+
+    Returns:
+        dict: Metric name -> float64 array, plus 'fps'. None if one of `metric_names` has not
+            been analyzed (or the video has changed since).
+    """
+    input_dir = metrics_path(video_path, analysis_scale=analysis_scale, motion_method=motion_method)
+    meta_path = os.path.join(input_dir, "meta.json")
+    metric_names = tuple(metric_names)
+    if not os.path.exists(meta_path) or not all(os.path.exists(os.path.join(input_dir, f"{name}.npy")) for name in metric_names):
+        return None
+
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+
+    metrics = {name: np.load(os.path.join(input_dir, f"{name}.npy"), mmap_mode='r') if name in metric_names
+               else np.full(meta["frame_count"], np.nan) for name in METRIC_NAMES}
+    if "transform" not in metric_names:
+        metrics["transform"] = None
+    metrics["fps"] = meta["fps"]
+    return metrics
+
+def load_or_analyze(video_path, batch_size=16, analysis_scale=1.0, motion_method="dense", metric_names=METRIC_NAMES):
+    """
+    Load the frame metrics of a video, measuring only the requested metrics that aren't stored yet.
+
+    Args:
+        video_path (str): Path to the video.
+        batch_size (int): Number of frames decoded and scored together during analysis.
+        analysis_scale (float): Proxy scale the metrics are measured at.
+        motion_method (str): 'dense' or 'sparse' motion metric.
+        metric_names (Iterable): Metrics needed, e.g. enabled_metrics(settings).
+
+    Returns:
+        dict: Metric name -> float64 array, plus 'fps'.
+    """
+    metric_names = tuple(metric_names)
+    metrics = load_metrics(video_path, analysis_scale, motion_method, metric_names)
+    if metrics is None:
+        stored = stored_metrics(video_path, analysis_scale, motion_method)
+        missing = [name for name in metric_names if name not in stored]
+        if analyze_video(video_path, batch_size, analysis_scale, motion_method, missing) is None:
+            return None
+        metrics = load_metrics(video_path, analysis_scale, motion_method, metric_names)
+    return metrics
+
+def cut(metrics, settings):
+    """
+    Cut pass: apply any set of filter settings to previously analyzed metrics.
+
+    Only vectorized comparisons over the stored arrays, so this takes milliseconds.
+
+    Args:
+        metrics (dict): Metrics as returned by load_metrics.
+        settings (Mapping): Filter settings, same keys as the `preprocessing` config section.
+
+    Returns:
+        tuple: (keep_mask, reasons) for every frame of the video.
+    """
+    return apply_thresholds(metrics, settings)
+
+def replay_cut(cap, keep_mask, reasons, batch_size=16, transforms=None):
+    """
+    Decode a video in batches and pair each batch with its precomputed cut decisions.
+
+    Yields the same tuples as batch_scoring.score_video, so the rendering loop is shared.
+
+    Args:
+        cap (cv2.VideoCapture): Opened capture of the analyzed video.
+        keep_mask (numpy.ndarray): Keep-mask returned by cut.
+        reasons (numpy.ndarray): Reason bitmasks returned by cut.
+        batch_size (int): Number of frames decoded together.
+        transforms (numpy.ndarray, optional): Stored global motion of every frame, for stabilization.
+
+    Yields:
+        tuple: (frames, keep_mask, reasons, transforms) for each batch.
+    """
+    start = 0
+    for frames in read_batches(cap, batch_size):
+        end = start + len(frames)
+        yield frames, keep_mask[start:end], reasons[start:end], None if transforms is None else transforms[start:end]
+        start = end
@@ -0,0 +1,81 @@
+import cv2
+import numpy as np
+
+# Beyond this gap, seeking (OpenCV decodes from the keyframe before the target) beats grabbing
+# through every frame; about one GOP of typical 1-2 s H.264 sources
+SEEK_THRESHOLD = 30
+
+def sample_indices(total_frames, num_frames, seed=None):
+    """
+    Pick distinct frames of a video at random, in increasing order.
+
+    Args:
+        total_frames (int): Number of frames of the video.
+        num_frames (int): Number of frames to pick (capped at total_frames).
+        seed (int, optional): Seed of the random generator; the same seed picks the same frames.
+
+    Returns:
+        numpy.ndarray: Sorted frame indices.
+    """
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(total_frames, size=min(num_frames, total_frames), replace=False))
+
+def stratified_indices(scenes, frames_per_scene, seed=None):
+    """
+    Pick frames of every scene, spread evenly over the scene and at random within it.
+
+    A scene of n picked frames is split into n equal strata with one frame drawn from each,
+    so long scenes aren't sampled only at one end and short scenes still get their share.
+
+    Args:
+        scenes (Iterable): (start_frame, end_frame) of every scene, end excluded, in order (e.g. a Timeline).
+        frames_per_scene (int): Number of frames to pick per scene (capped at the scene length).
+        seed (int, optional): Seed of the random generator; the same seed picks the same frames.
+
+    Returns:
+        tuple: (frame_indices, scene_ids) numpy arrays; the scene index of every picked frame,
+            in increasing frame order.
+    """
+    rng = np.random.default_rng(seed)
+    frame_indices, scene_ids = [], []
+    for scene_id, (start_frame, end_frame) in enumerate(scenes):
+        num_frames = min(frames_per_scene, end_frame - start_frame)
+        if num_frames <= 0:
+            continue
+        # Stratum boundaries, at least one frame apart since num_frames <= scene length
+        edges = start_frame + np.arange(num_frames + 1) * (end_frame - start_frame) // num_frames
+        frame_indices.append(edges[:-1] + (rng.random(num_frames) * np.diff(edges)).astype(np.int64))
+        scene_ids.append(np.full(num_frames, scene_id))
+    if not frame_indices:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(frame_indices), np.concatenate(scene_ids)
+
+def read_frames(cap, frame_indices, seek_threshold=SEEK_THRESHOLD):
+    """
+    Read the given frames of a video in a single forward pass.
+
+    The indices are visited in increasing order. Frames in between are skipped with
+    grab(), and only the wanted frames are converted with retrieve(). Across gaps longer
+    than `seek_threshold` frames the capture seeks instead, which makes OpenCV
+    decode from the keyframe before the target rather than through the whole gap.
+
+    Args:
+        cap (cv2.VideoCapture): Opened capture.
+        frame_indices (Iterable): Frame indices to read, in any order; duplicates are read once.
+        seek_threshold (int): Gap, in frames, beyond which seeking is cheaper than grabbing.
+
+    Yields:
+        tuple: (frame_index, frame) in increasing frame order. Frames past the end of the video are skipped.
+    """
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))  # Index of the next frame grab() returns
+    for frame_index in np.unique(np.asarray(frame_indices, dtype=np.int64)).tolist():
+        if frame_index < position or frame_index - position > seek_threshold:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            position = frame_index
+        while position <= frame_index:
+            if not cap.grab():
+                return
+            position += 1
+        ret, frame = cap.retrieve()
+        if ret:
+            yield frame_index, frame
@@ -1,90 +1,131 @@
 import cv2
 import os
 import argparse
+from collections.abc import Iterator
 from omegaconf import OmegaConf
 
+from clip_extraction import extract_clips
+from edit_decision_list import EDL_SUFFIX, open_video, preprocessed_video_path
+from parallel_clip_export import export_clips_parallel
+from pipeline import prefetch
+from scene_detection import iter_scenes_native
+from scene_timeline import Timeline
+from stream_copy import export_clips_stream_copy
+from video_io import find_ffmpeg
+
 import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def export_clips(cap, scene_frames, output_shorts_path, frame_rate):
+    """
+    Write one clip per scene, decoding the video once front to back (see clip_extraction.extract_clips).
+
+    Args:
+        cap (cv2.VideoCapture or EdlReader): Opened reader of the video the scenes refer to, at its first frame.
+        scene_frames (Iterable): (start_frame, end_frame) of every scene, end excluded, such as a
+            Timeline. May be a generator still detecting later scenes while earlier ones are written,
+            as long as it yields them in order.
+        output_shorts_path (str): Directory the clips are written to.
+        frame_rate (float): Frame rate of the clips.
+
+    Yields:
+        str: Path of every clip once it is written.
+    """
+    frame_size = (int(cap.get(3)), int(cap.get(4)))
+    clips = ((start_frame, end_frame, os.path.join(output_shorts_path, f'clip_{i + 1}.mp4'))
+             for i, (start_frame, end_frame) in enumerate(scene_frames))
+    if not isinstance(scene_frames, Iterator):
+        # Scenes given up front may be in any order; the single pass needs them by start frame
+        clips = sorted(clips)
+    yield from extract_clips(cap, clips, frame_rate, frame_size)
+
+def stream_scene_frames(video_path, timeline_config, timeline_log, timeline_path):
+    """
+    Detect scenes in a background thread, handing each one over as soon as its end is confirmed.
+
+    The scenes are also appended to the timeline log as they are found; the binary
+    timeline is saved once detection is complete.
+
+    Args:
+        video_path (str): Path to the video, or to an edit decision list.
+        timeline_config (omegaconf.DictConfig): Scene detection settings (config.timeline).
+        timeline_log (str): Path of the text timeline log to write.
+        timeline_path (str): Path of the binary timeline to write.
+
+    Yields:
+        tuple: (start_frame, end_frame) of every scene.
+    """
+    detection_cap = open_video(video_path)
+    fps = detection_cap.get(cv2.CAP_PROP_FPS)
+    scene_list = []
+    scenes = iter_scenes_native(detection_cap, timeline_config.threshold, timeline_config.min_scene_len,
+                                timeline_config.frame_skip, timeline_config.batch_size)
+    try:
+        with open(timeline_log, 'w') as file:
+            # Detection runs ahead in its own thread while the caller encodes the previous clip
+            for i, (start, end) in enumerate(prefetch(scenes)):
+                file.write(f"Scene {i + 1}: Start frame {start} - End frame {end}\n")
+                file.flush()
+                scene_list.append((start, end))
+                yield start.get_frames(), end.get_frames()
+        Timeline.from_scene_list(scene_list, fps).save(timeline_path)
+    finally:
+        detection_cap.release()
+
 def main(args):
     """
-    Extracts video clips based on scene information from a timeline log file.
-    
+    Extracts video clips based on the scenes of the binary timeline.
+
     Args:
         args (argparse.Namespace): Command-line arguments.
 
     Returns:
         None
     """
-    config = OmegaConf.load(f"../config/{args.config}.yaml")   
+    config = OmegaConf.load(f"../config/{args.config}.yaml")
     timeline_log =  config.path.log.timeline_log
-    input_video_path = config.path.data.preprocessing_output
+    timeline_path = config.path.log.timeline_index
+    input_video_path = preprocessed_video_path(config)
     output_shorts_path = config.path.data.shorts_output
-    
-    # Load the scene information from the text file
-    with open(timeline_log, 'r') as file:
-        lines = file.readlines()
-    logger.info("lines information: %s", lines)
-    
-    scenes = []
-    for line in lines:
-        if line.startswith("Scene"):
-            parts = line.split()
-            print(parts)
-            scene_start = parts[4]
-            scene_end = parts[-1]
-            scenes.append({"start": scene_start, "end": scene_end})
-    logger.info("scenes information: %s", scenes)
-    
-    # Open the input video file
-    cap = cv2.VideoCapture(input_video_path)
+
+    # Open the preprocessed video, or the input through the edit decision list of kept frames
+    cap = open_video(input_video_path)
 
     # Ensure the output directory exists
     os.makedirs(output_shorts_path, exist_ok=True)
 
-    # Convert scene start and end times to frames
-    frame_rate = int(cap.get(cv2.CAP_PROP_FPS))
-    scene_frames = []
-    logger.info("🔥 Video clips extract starts.")
-    for scene in scenes:
-        start_time_parts = scene["start"].split(':')
-        end_time_parts = scene["end"].split(':')
-        
-        start_frame = (
-            int(start_time_parts[0]) * 3600 * frame_rate +
-            int(start_time_parts[1]) * 60 * frame_rate +
-            int(float(start_time_parts[2]) * frame_rate)
-        )
-        
-        end_frame = (
-            int(end_time_parts[0]) * 3600 * frame_rate +
-            int(end_time_parts[1]) * 60 * frame_rate +
-            int(float(end_time_parts[2]) * frame_rate)
-        )
-        
-        scene_frames.append({"start": start_frame, "end": end_frame})
+    # Clips keep the exact (possibly fractional) frame rate of the video
+    frame_rate = cap.get(cv2.CAP_PROP_FPS)
+    if config.shorts.stream:
+        # Scenes are detected here instead of by timeline.py; clip N is encoded while clip N+1 is detected
+        scene_frames = stream_scene_frames(input_video_path, config.timeline, timeline_log, timeline_path)
+    else:
+        # Exact scene frame numbers, saved by timeline.py (or by preprocessing with detect_scenes)
+        scene_frames = Timeline.load(timeline_path)
+        logger.info("scenes information: %s", list(scene_frames))
+
+    export = config.shorts.export
+    if export == "stream_copy" and input_video_path.endswith(EDL_SUFFIX):
+        logger.warning("Stream-copy export needs a real video file, not an edit decision list; re-encoding the clips with OpenCV.")
+        export = "opencv"
+    if export == "stream_copy" and find_ffmpeg() is None:
+        logger.warning("ffmpeg is not available for stream-copy export; re-encoding the clips with OpenCV.")
+        export = "opencv"
 
     # Extract video clips for each scene
-    for i, scene in enumerate(scene_frames):
-        start_frame = scene["start"]
-        end_frame = scene["end"]
-        clip_name = f'clip_{i + 1}.mp4'
-        
-        # Set the video writer for the output clip
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(os.path.join(output_shorts_path, clip_name), fourcc, frame_rate, (int(cap.get(3)), int(cap.get(4))))
-        
-        # Seek to the start frame
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-        
-        while cap.get(cv2.CAP_PROP_POS_FRAMES) <= end_frame:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            out.write(frame)
-        
-        out.release()
+    logger.info("🔥 Video clips extract starts.")
+    if export == "stream_copy":
+        # Whole GOPs are copied without decoding; only partial GOPs at the clip ends are re-encoded
+        clip_paths = export_clips_stream_copy(input_video_path, scene_frames, output_shorts_path, frame_rate)
+    elif config.shorts.workers > 1:
+        # Clips are spread over a process pool, each worker reading the video with its own capture
+        clip_paths = export_clips_parallel(input_video_path, scene_frames, output_shorts_path, frame_rate,
+                                           (int(cap.get(3)), int(cap.get(4))), config.shorts.workers)
+    else:
+        clip_paths = export_clips(cap, scene_frames, output_shorts_path, frame_rate)
+    for clip_path in clip_paths:
+        logger.info(f"Clip saved to {clip_path}")
 
     # Release the input video
     cap.release()
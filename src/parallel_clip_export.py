@@ -0,0 +1,92 @@
+import cv2
+import os
+import numpy as np
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+
+from clip_extraction import extract_clips
+from edit_decision_list import open_video
+
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def split_clips(clips, num_groups):
+    """
+    Split clips sorted by start frame into contiguous groups with nearly equal frame totals.
+
+    Args:
+        clips (list): (start_frame, end_frame, clip_path) of every clip, sorted by start frame.
+        num_groups (int): Number of groups.
+
+    Returns:
+        list: Non-empty lists of clips, in order.
+    """
+    lengths = np.array([end_frame - start_frame for start_frame, end_frame, _ in clips], dtype=np.float64)
+    # Group of every clip, from the share of all frames written before its midpoint
+    midpoints = np.cumsum(lengths) - lengths / 2
+    group_of = np.minimum((midpoints / max(lengths.sum(), 1) * num_groups).astype(int), num_groups - 1)
+    return [[clip for clip, group in zip(clips, group_of) if group == g] for g in np.unique(group_of)]
+
+def render_clips(video_path, clips, frame_rate, frame_size):
+    """
+    Write a group of clips from a capture opened by this worker.
+
+    The capture seeks once to the first clip, then the group is written in a single
+    front-to-back pass (see clip_extraction.extract_clips).
+
+    Args:
+        video_path (str): Path to the video, or to an edit decision list.
+        clips (list): (start_frame, end_frame, clip_path) of every clip, sorted by start frame.
+        frame_rate (float): Frame rate of the clips.
+        frame_size (tuple): (width, height) of the frames.
+
+    Returns:
+        list: Paths of the clips written.
+    """
+    cap = open_video(video_path)
+    first_frame = clips[0][0]
+    if first_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
+    clip_paths = list(extract_clips(cap, clips, frame_rate, frame_size, first_frame))
+    cap.release()
+    return clip_paths
+
+def export_clips_parallel(video_path, scene_frames, output_shorts_path, frame_rate, frame_size, workers=4):
+    """
+    Write one clip per scene, spreading the clips over a process pool.
+
+    Every worker opens its own capture and writers. Scenes given up front are split
+    into a few contiguous groups per worker; scenes still arriving from a generator
+    are submitted one by one as they arrive.
+
+    Args:
+        video_path (str): Path to the video, or to an edit decision list.
+        scene_frames (Iterable): (start_frame, end_frame) of every scene, end excluded.
+        output_shorts_path (str): Directory the clips are written to.
+        frame_rate (float): Frame rate of the clips.
+        frame_size (tuple): (width, height) of the frames.
+        workers (int): Number of worker processes.
+
+    Returns:
+        list: Clip paths, in scene order.
+    """
+    clips = ((start_frame, end_frame, os.path.join(output_shorts_path, f'clip_{i + 1}.mp4'))
+             for i, (start_frame, end_frame) in enumerate(scene_frames))
+    streaming = isinstance(scene_frames, Iterator)
+
+    logger.info(f"🔥 Parallel clip export starts on {workers} workers.")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if streaming:
+            # Scenes are still being detected: every clip is submitted as soon as its scene arrives
+            futures = [executor.submit(render_clips, video_path, [clip], frame_rate, frame_size) for clip in clips]
+        else:
+            clips = list(clips)
+            # A few groups per worker keeps the pool busy when clips take uneven time
+            groups = split_clips(sorted(clips), workers * 2) if clips else []
+            futures = [executor.submit(render_clips, video_path, group, frame_rate, frame_size) for group in groups]
+        rendered = [clip_path for future in futures for clip_path in future.result()]
+
+    if streaming:
+        return rendered
+    return [clip_path for _, _, clip_path in clips]
@@ -0,0 +1,137 @@
+import cv2
+import os
+import shutil
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from batch_scoring import read_batches, score_batch, apply_thresholds
+from video_io import concat_videos
+
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Frames decoded before a chunk to seed the motion state (the sparse shake score
+# compares a frame's global motion with its predecessor's, which needs two frames)
+SEED_FRAMES = 2
+
+def split_ranges(total_frames, num_chunks, align=1):
+    """
+    Split [0, total_frames) into contiguous, nearly equal frame ranges.
+
+    Args:
+        total_frames (int): Number of frames in the video.
+        num_chunks (int): Number of ranges.
+        align (int): Every range starts at a multiple of this, so a chunk decoded in batches of
+            `align` frames gets the same batches as a serial run (motion calibration and
+            subsampling work per batch).
+
+    Returns:
+        list: (start, end) tuples in order. The last range has end None, meaning
+            "until the end of the video", since frame counts reported by containers
+            can be off.
+    """
+    num_chunks = max(1, min(num_chunks, total_frames))
+    bounds = np.unique(np.linspace(0, total_frames, num_chunks + 1) // align * align).astype(int)
+    if len(bounds) < 2 or bounds[-1] < total_frames:
+        bounds = np.append(bounds, total_frames)
+    ranges = [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:])]
+    ranges[-1] = (ranges[-1][0], None)
+    return ranges
+
+def process_chunk(input_video_path, start, end, settings, batch_size, chunk_output_path):
+    """
+    Run the filter chain on frames [start, end) of a video and encode the kept frames.
+
+    The frames just before the chunk are decoded to seed the motion filter, so
+    motion decisions at chunk boundaries match a serial run.
+
+    Args:
+        input_video_path (str): Path to the input video.
+        start (int): First frame of the chunk.
+        end (int): Frame after the last frame of the chunk, or None for the end of the video.
+        settings (dict): Filter settings, same keys as the `preprocessing` config section.
+        batch_size (int): Number of frames decoded and scored together.
+        chunk_output_path (str): Path of the video holding the chunk's kept frames, or None to only score.
+
+    Returns:
+        numpy.ndarray: Reason bitmask of every frame in the chunk.
+    """
+    cap = cv2.VideoCapture(input_video_path)
+    out = None
+    if chunk_output_path is not None:
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        fps = int(cap.get(5))
+        frame_size = (int(cap.get(3)), int(cap.get(4)))
+        out = cv2.VideoWriter(chunk_output_path, fourcc, fps, frame_size)
+
+    motion_state = None
+    if start > 0:
+        # Score the frames just before the chunk only to get their motion state
+        seed_start = max(start - SEED_FRAMES, 0)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, seed_start)
+        seed_frames = next(read_batches(cap, start - seed_start), None)
+        if seed_frames is not None:
+            _, motion_state = score_batch(seed_frames, settings)
+
+    max_frames = None if end is None else end - start
+    chunk_reasons = []
+    for frames in read_batches(cap, batch_size, max_frames):
+        metrics, motion_state = score_batch(frames, settings, motion_state)
+        keep_mask, reasons = apply_thresholds(metrics, settings)
+        if out is not None:
+            for frame in frames[keep_mask]:
+                out.write(frame)
+        chunk_reasons.append(reasons)
+
+    cap.release()
+    if out is not None:
+        out.release()
+    return np.concatenate(chunk_reasons) if chunk_reasons else np.empty(0, dtype=np.uint8)
+
+def preprocess_parallel(input_video_path, output_video_path, settings, workers, batch_size=16):
+    """
+    Preprocess a video with a process pool, one time range per task, and stitch the results in order.
+
+    Args:
+        input_video_path (str): Path to the input video.
+        output_video_path (str): Path of the preprocessed video, or None to only score the frames.
+        settings (dict): Filter settings, same keys as the `preprocessing` config section.
+        workers (int): Number of worker processes.
+        batch_size (int): Number of frames decoded and scored together.
+
+    Returns:
+        numpy.ndarray: Reason bitmask of every frame of the input, 0 for kept frames.
+    """
+    cap = cv2.VideoCapture(input_video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    # A few chunks per worker keeps the pool busy when chunks take uneven time
+    ranges = split_ranges(total_frames, workers * 4, batch_size)
+    if output_video_path is None:
+        temp_dir = None
+        chunk_paths = [None] * len(ranges)
+    else:
+        temp_dir = tempfile.mkdtemp()
+        chunk_paths = [os.path.join(temp_dir, f"chunk_{i:05d}.mp4") for i in range(len(ranges))]
+
+    logger.info(f"🔥 Parallel processing starts: {len(ranges)} chunks on {workers} workers.")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(process_chunk, input_video_path, start, end, settings, batch_size, chunk_path)
+            for (start, end), chunk_path in zip(ranges, chunk_paths)
+        ]
+        chunk_reasons = [future.result() for future in futures]
+
+    if temp_dir is not None:
+        # Chunks where every frame was dropped produce empty videos; leave them out of the stitch
+        kept_chunk_paths = [path for path, reasons in zip(chunk_paths, chunk_reasons) if (reasons == 0).any()]
+        if kept_chunk_paths:
+            concat_videos(kept_chunk_paths, output_video_path)
+        else:
+            logger.warning("Every frame was excluded; no output video was written.")
+        shutil.rmtree(temp_dir)
+
+    return np.concatenate(chunk_reasons)
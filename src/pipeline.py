@@ -0,0 +1,89 @@
+import queue
+import threading
+
+from batch_scoring import read_batches, score_batches
+
+# Marks the end of a stage's output
+_END = object()
+
+class _StageError:
+    """Wraps an exception raised inside a stage so it can be re-raised by the consumer."""
+
+    def __init__(self, error):
+        self.error = error
+
+def prefetch(iterable, queue_size=4):
+    """
+    Run an iterable in its own thread, handing its items over through a bounded queue.
+
+    The producer blocks once `queue_size` items are waiting (backpressure), so memory stays
+    bounded by the queue depth. OpenCV releases the GIL while decoding, filtering and
+    encoding, so chained stages genuinely overlap. Exceptions raised by the producer are
+    re-raised in the consumer.
+
+    Args:
+        iterable (Iterable): Stage to run in the background.
+        queue_size (int): Maximum number of items waiting between the stages.
+
+    Yields:
+        Items of `iterable`, in order.
+    """
+    items = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item):
+        # Poll so the producer notices when the consumer has gone away
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    break
+            else:
+                put(_END)
+        except BaseException as error:
+            put(_StageError(error))
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _END:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+def pipelined_score_video(cap, settings, batch_size=16, queue_size=4):
+    """
+    Threaded counterpart of batch_scoring.score_video.
+
+    Decoding and filtering run in their own threads, connected by bounded queues; the
+    caller's loop (writing the kept frames) is the encode stage.
+
+    Args:
+        cap (cv2.VideoCapture): Opened video capture.
+        settings (Mapping): Filter settings, same keys as the `preprocessing` config section.
+        batch_size (int): Number of frames decoded and scored together.
+        queue_size (int): Maximum number of batches waiting between two stages.
+
+    Returns:
+        Iterator: (frames, keep_mask, reasons, transforms) for each batch (see batch_scoring.score_batches).
+    """
+    decoded_batches = prefetch(read_batches(cap, batch_size), queue_size)
+    return prefetch(score_batches(decoded_batches, settings), queue_size)
@@ -2,76 +2,23 @@ import cv2
 import argparse
 from omegaconf import OmegaConf
 import os
+import numpy as np
 from tqdm import tqdm 
+from scenedetect.detectors import ContentDetector
+
+from batch_scoring import score_video
+from edit_decision_list import EditDecisionList, open_video
+from exclusion_log import ExclusionLog
+from frame_metrics import enabled_metrics, load_or_analyze, cut, replay_cut
+from parallel_preprocessing import preprocess_parallel
+from pipeline import prefetch, pipelined_score_video
+from scene_detection import SceneListBuilder, detect_scenes, write_scene_list
+from stabilization import Stabilizer
 
 import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def is_dark(frame, brightness_threshold):
-    """
-    Check if a frame is dark based on its brightness.
-
-    Args:
-        frame (numpy.ndarray): Input frame.
-        brightness_threshold (float): Threshold for darkness.
-
-    Returns:
-        bool: True if the frame is dark, False otherwise.
-    """
-    # Convert the frame to grayscale
-    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    
-    # Calculate the average brightness
-    avg_brightness = cv2.mean(gray_frame)[0]
-    return avg_brightness < brightness_threshold
-
-def is_shaky(frame, prev_frame, motion_threshold):
-    """
-    Check if a frame is shaky based on motion analysis with the previous frame.
-
-    Args:
-        frame (numpy.ndarray): Current frame.
-        prev_frame (numpy.ndarray): Previous frame.
-        motion_threshold (float): Threshold for shakiness.
-
-    Returns:
-        bool: True if the frame is shaky, False otherwise.
-    """
-    # Convert frames to grayscale
-    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    gray_prev_frame = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
-
-    # Calculate dense optical flow using Farneback method
-    flow = cv2.calcOpticalFlowFarneback(gray_prev_frame, gray_frame, None, 0.5, 3, 15, 3, 5, 1.2, 0)
-
-    # Compute the magnitude of the motion vectors
-    motion_magnitude = cv2.norm(flow, cv2.NORM_L2)
-
-    return motion_magnitude > motion_threshold
-
-def is_noisy(frame, noise_threshold):
-    """
-    Check if a frame is noisy based on image noise analysis.
-
-    Args:
-        frame (numpy.ndarray): Input frame.
-        noise_threshold (float): Threshold for noise.
-
-    Returns:
-        bool: True if the frame is noisy, False otherwise.
-    """
-    # Apply Gaussian blur to the frame
-    blurred_frame = cv2.GaussianBlur(frame, (5, 5), 0)
-
-    # Calculate the absolute difference between the original frame and the blurred frame
-    frame_diff = cv2.absdiff(frame, blurred_frame)
-
-    # Calculate the mean pixel difference
-    mean_diff = cv2.mean(frame_diff)[0]
-
-    return mean_diff > noise_threshold
-
 def main(args):
     """
     Process a video, saving frames that meet a quality threshold and logging the process.
@@ -82,91 +29,157 @@ def main(args):
     config = OmegaConf.load(f"../config/{args.config}.yaml")
     input_video_path = config.path.data.input
     output_video_path = config.path.data.preprocessing_output
-    log_file_path = config.path.log.preprocessing_log  # Path to the text log file
+    edl_path = config.path.data.preprocessing_edl
+    log_file_path = config.path.log.preprocessing_log  # Path to the exclusion log (JSON lines)
+    scene_list_path = config.path.log.timeline_log
+    timeline_path = config.path.log.timeline_index
 
     # Create the output directory if it doesn't exist.
     os.makedirs(output_video_path[:15], exist_ok=True)
     os.makedirs(log_file_path[:7], exist_ok=True)
 
-    # TODO: Handle threshold values and boolean info through config file
-    brightness_bool = config.preprocessing.brightness_bool
-    motion_bool = config.preprocessing.motion_bool
-    noise_bool = config.preprocessing.noise_bool
-    
-    quality_threshold = config.preprocessing.quality_threshold
-    brightness_threshold = config.preprocessing.brightness_threshold
-    motion_threshold = config.preprocessing.motion_threshold
-    noise_threshold = config.preprocessing.noise_threshold
+    # Filter switches and thresholds are read from config.preprocessing by the scoring engine
+    settings = OmegaConf.to_container(config.preprocessing)
+    materialize = settings["materialize"]
+    if settings["stabilize_bool"] and not materialize:
+        logger.warning("Stabilization renders the output video and is skipped when materialize is off.")
+        settings["stabilize_bool"] = False
+    if settings["stabilize_bool"] and settings["workers"] > 1 and not settings["two_pass"]:
+        # The smoothed trajectory runs across chunk boundaries, so the output is written in order
+        logger.warning("Stabilization follows the camera trajectory in order; running without parallel workers.")
+        settings["workers"] = 1
+    batch_size = settings["batch_size"]
+    if settings["subsample_step"] > 1 and not settings["two_pass"]:
+        # Batches are subsampled on their own, so give each one a few sampling steps
+        batch_size = max(batch_size, 4 * settings["subsample_step"])
 
     cap = cv2.VideoCapture(input_video_path)
-    ret, frame = cap.read()
-    prev_frame = frame
 
     if not cap.isOpened():
         logger.warning(f"Unable to load the video. File path: {input_video_path}")
         return
 
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    fps = int(cap.get(5))
-    frame_size = (int(cap.get(3)), int(cap.get(4)))
-    out = cv2.VideoWriter(output_video_path, fourcc, fps, frame_size)
+    source_fps = cap.get(cv2.CAP_PROP_FPS)
+    fps = int(source_fps)
+    frame_interval = 1.0 / fps  # Time duration per frame
+
+    if settings["workers"] > 1 and not settings["two_pass"]:
+        # Time ranges are filtered and encoded in a process pool, then stitched back in order
+        cap.release()
+        all_reasons = preprocess_parallel(input_video_path, output_video_path if materialize else None, settings, settings["workers"], batch_size)
+
+        ExclusionLog.from_reasons(all_reasons, source_fps).save(log_file_path)
+
+        saved_frame_count = int((all_reasons == 0).sum())
+        if not materialize:
+            EditDecisionList.from_keep_mask(input_video_path, source_fps, all_reasons == 0).save(edl_path)
+        if settings["detect_scenes"]:
+            # Chunks are filtered out of order, so scenes are detected on the result afterwards
+            logger.warning("Scene detection can't share the decode with parallel preprocessing; running it as a separate pass.")
+            scene_cap = open_video(output_video_path if materialize else edl_path)
+            write_scene_list(detect_scenes(scene_cap, ContentDetector(config.timeline.threshold, config.timeline.min_scene_len)),
+                             source_fps, scene_list_path, timeline_path)
+            scene_cap.release()
+        logger.info("🔥 Processing complete.")
+        logger.info(f"Output video duration: {saved_frame_count * frame_interval:.2f} seconds")
+        logger.info(f"Processed {len(all_reasons)} frames, Saved {saved_frame_count} frames")
+        return
+
+    out = None
+    if materialize:
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        frame_size = (int(cap.get(3)), int(cap.get(4)))
+        out = cv2.VideoWriter(output_video_path, fourcc, fps, frame_size)
 
     frame_count = 0
     saved_frame_count = 0
-    frame_interval = 1.0 / fps  # Time duration per frame
+    reason_batches = []
+
+    stabilizer = None
+    if settings["stabilize_bool"]:
+        # Kept frames are warped onto the smoothed camera trajectory as they are written
+        stabilizer = Stabilizer(settings["smoothing_radius"])
+
+    scene_builder = None
+    if settings["detect_scenes"]:
+        # Scenes are detected on the kept frames as they are decoded, on the kept-frame timeline
+        scene_builder = SceneListBuilder(source_fps, int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                         ContentDetector(config.timeline.threshold, config.timeline.min_scene_len))
 
     # Create a tqdm progress bar
     progress_bar = tqdm(total=int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
                     
     logger.info("🔥 Processing starts.")
 
-    with open(log_file_path, 'w') as log_file:
-        while True:
-            ret, frame = cap.read()
-
-            if not ret:
-                logger.warning(f"Reached the end of the video or encountered an issue while reading the video. File path: {input_video_path}")
-                break
-
-            frame_quality = cv2.mean(frame)[0]
-            exclude_reasons = []  # Store reasons for frame exclusion
-
-            if frame_quality < quality_threshold:
-                exclude_reasons.append("Quality below threshold")
-
-            if brightness_bool and is_dark(frame, brightness_threshold):
-                exclude_reasons.append("Dark frame")
-
-            if motion_bool and is_shaky(frame, prev_frame, motion_threshold):
-                exclude_reasons.append("Shaky frame")
+    queue_size = settings["queue_size"]
+    if settings["two_pass"]:
+        # Analyze once (or reuse the stored frame metrics), then cut with the current thresholds
+        metrics = load_or_analyze(input_video_path, batch_size, settings["analysis_scale"], settings["motion_method"],
+                                  enabled_metrics(settings))
+        all_keep_mask, all_reasons = cut(metrics, settings)
+        if materialize:
+            scored_batches = replay_cut(cap, all_keep_mask, all_reasons, batch_size, metrics["transform"])
+            if settings["pipeline"]:
+                scored_batches = prefetch(scored_batches, queue_size)
+        elif scene_builder is not None:
+            scored_batches = replay_cut(cap, all_keep_mask, all_reasons, batch_size)
+        else:
+            # Nothing to write or detect, so the video isn't decoded again
+            scored_batches = [(None, all_keep_mask, all_reasons, None)]
+    elif settings["pipeline"]:
+        # Decode, filter and encode stages run concurrently, connected by bounded queues
+        scored_batches = pipelined_score_video(cap, settings, batch_size, queue_size)
+    else:
+        scored_batches = score_video(cap, settings, batch_size)
+
+    # Frames are decoded and scored in batches; only writing stays per frame
+    for frames, keep_mask, reasons, transforms in scored_batches:
+        if out is not None or scene_builder is not None:
+            for frame in frames[keep_mask]:
+                if out is not None and stabilizer is None:
+                    out.write(frame)
+                if scene_builder is not None:
+                    scene_builder.add_frame(frame)
+        if stabilizer is not None:
+            for frame in stabilizer.add_batch(frames, keep_mask, transforms):
+                out.write(frame)
+        frame_count += len(keep_mask)
+        saved_frame_count += int(keep_mask.sum())
+        reason_batches.append(reasons)
 
-            if noise_bool and is_noisy(frame, noise_threshold):
-                exclude_reasons.append("Noisy frame")
+        logger.info(f"Processed {frame_count} frames, Saved {saved_frame_count} frames")
 
-            if not exclude_reasons:
-                out.write(frame)
-                saved_frame_count += 1
-            else:
-                log_file.write(f"Deleted frame at time {frame_count * frame_interval:.2f} seconds. Reasons: {', '.join(exclude_reasons)}\n")
+        # Update the tqdm progress bar
+        progress_bar.update(len(keep_mask))
 
-            frame_count += 1
-            prev_frame = frame
+    logger.warning(f"Reached the end of the video or encountered an issue while reading the video. File path: {input_video_path}")
 
-            if frame_count % 10 == 0:
-                logger.info(f"Processed {frame_count} frames, Saved {saved_frame_count} frames")
+    # Close the tqdm progress bar
+    progress_bar.close()
 
-            # Update the tqdm progress bar
-            progress_bar.update(1)
+    # Excluded frames are logged as runs of frames sharing the same reasons
+    all_reasons = np.concatenate(reason_batches) if reason_batches else np.empty(0, dtype=np.uint8)
+    ExclusionLog.from_reasons(all_reasons, source_fps).save(log_file_path)
 
-        # Close the tqdm progress bar
-        progress_bar.close()
+    if scene_builder is not None:
+        write_scene_list(scene_builder.scene_list(), source_fps, scene_list_path, timeline_path)
+        logger.info(f"Scene list saved to {scene_list_path}")
 
     logger.info("🔥 Processing complete.")
     logger.info(f"Output video duration: {saved_frame_count * frame_interval:.2f} seconds")
     logger.info(f"Processed {frame_count} frames, Saved {saved_frame_count} frames")
 
     cap.release()
-    out.release()
+    if out is not None:
+        if stabilizer is not None:
+            # The last frames were waiting for the end of their smoothing window
+            for frame in stabilizer.flush():
+                out.write(frame)
+        out.release()
+    else:
+        # Downstream stages read the kept frames straight from the input through this list
+        EditDecisionList.from_keep_mask(input_video_path, source_fps, all_reasons == 0).save(edl_path)
+        logger.info(f"Edit decision list saved to {edl_path}")
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
@@ -0,0 +1,423 @@
+import cv2
+import numpy as np
+from scenedetect import FrameTimecode
+from scenedetect.detectors import ContentDetector
+from scenedetect.scene_manager import compute_downscale_factor, get_scenes_from_cuts
+
+from pipeline import prefetch
+from scene_timeline import Timeline
+
+class SceneListBuilder:
+    """
+    Feed frames to a PySceneDetect detector one at a time and build the scene list at the end.
+
+    Frames are numbered in the order they are fed, so feeding only the kept frames of a
+    video yields scenes on the kept-frame timeline. Frames are downscaled the same way
+    SceneManager does by default.
+
+    Args:
+        fps (float): Frame rate of the timeline the scenes are expressed in.
+        frame_width (int): Width of the frames, to pick the downscale factor.
+        detector (SceneDetector, optional): Detector to run. Defaults to ContentDetector().
+    """
+
+    def __init__(self, fps, frame_width, detector=None):
+        self.fps = fps
+        self.detector = ContentDetector() if detector is None else detector
+        self.downscale_factor = compute_downscale_factor(frame_width)
+        self.frame_num = 0
+        self.cut_list = []
+
+    def add_frame(self, frame):
+        """Run the detector on the next frame of the timeline."""
+        frame = downscale_frame(frame, self.downscale_factor)
+        self.cut_list += self.detector.process_frame(self.frame_num, frame)
+        self.frame_num += 1
+
+    def scene_list(self):
+        """
+        Finish detection.
+
+        Returns:
+            list: (start, end) FrameTimecode tuples, like SceneManager.get_scene_list(). Empty if no cut was found.
+        """
+        cut_list = self.cut_list + self.detector.post_process(self.frame_num - 1)
+        return scene_list_from_cuts(sorted(set(cut_list)), self.frame_num, self.fps)
+
+def detect_scenes(cap, detector=None):
+    """
+    Run a PySceneDetect detector over the frames of any cv2.VideoCapture-like reader.
+
+    Unlike VideoManager, this works on virtual videos such as an EdlReader.
+
+    Args:
+        cap (cv2.VideoCapture or EdlReader): Opened reader, positioned at the first frame.
+        detector (SceneDetector, optional): Detector to run. Defaults to ContentDetector().
+
+    Returns:
+        list: (start, end) FrameTimecode tuples, like SceneManager.get_scene_list(). Empty if no cut was found.
+    """
+    builder = SceneListBuilder(cap.get(cv2.CAP_PROP_FPS), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), detector)
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        builder.add_frame(frame)
+    return builder.scene_list()
+
+def downscale_frame(frame, downscale_factor):
+    """
+    Downscale a frame the way SceneManager does before detection.
+
+    Args:
+        frame (numpy.ndarray): Frame to downscale.
+        downscale_factor (int): Integer factor; 1 or less leaves the frame unchanged.
+
+    Returns:
+        numpy.ndarray: Downscaled frame.
+    """
+    if downscale_factor <= 1:
+        return frame
+    return cv2.resize(frame, (round(frame.shape[1] / downscale_factor), round(frame.shape[0] / downscale_factor)))
+
+def batch_hsv(frames):
+    """
+    Convert a batch of BGR frames to HSV with a single cv2 call.
+
+    Args:
+        frames (numpy.ndarray): Batch of BGR frames (N, H, W, 3).
+
+    Returns:
+        numpy.ndarray: HSV frames (N, H, W, 3).
+    """
+    num_frames, height, width = frames.shape[:3]
+    frames = np.ascontiguousarray(frames)
+    return cv2.cvtColor(frames.reshape(num_frames * height, width, 3), cv2.COLOR_BGR2HSV).reshape(frames.shape)
+
+def content_scores(hsv_frames, prev_hsv=None):
+    """
+    Content-change score of every frame against its predecessor.
+
+    Same score as ContentDetector with its default weights: the mean absolute
+    difference of hue, saturation and value, averaged over the three channels.
+
+    Args:
+        hsv_frames (numpy.ndarray): HSV frames (N, H, W, 3).
+        prev_hsv (numpy.ndarray, optional): HSV frame preceding the batch. The first frame
+            of the video has no predecessor and scores 0.
+
+    Returns:
+        numpy.ndarray: float64 array of shape (N,).
+    """
+    if prev_hsv is None:
+        previous = np.concatenate([hsv_frames[:1], hsv_frames[:-1]])
+    else:
+        previous = np.concatenate([prev_hsv[np.newaxis], hsv_frames[:-1]])
+    num_frames, height = hsv_frames.shape[:2]
+    # Saturating uint8 absdiff on the batch viewed as one tall image, then one sum per frame
+    delta = cv2.absdiff(hsv_frames.reshape(num_frames * height, -1), previous.reshape(num_frames * height, -1))
+    delta = delta.reshape(num_frames, -1)
+    return np.array([cv2.sumElems(frame_delta)[0] for frame_delta in delta]) / delta.shape[1]
+
+def iter_cuts(scored_batches, threshold=27.0, min_scene_len=15):
+    """
+    Apply ContentDetector's threshold and minimum-scene-length rules to a stream of score batches.
+
+    Args:
+        scored_batches (Iterable): (scores, frame_nums) pairs in frame order, frame numbers increasing.
+        threshold (float): Score a frame must reach to start a new scene.
+        min_scene_len (int): Minimum number of frames between two cuts (and before the first one).
+
+    Yields:
+        int: Frame number of every cut, as soon as its batch is scored.
+    """
+    last_cut = None
+    for scores, frame_nums in scored_batches:
+        if len(frame_nums) == 0:
+            continue
+        if last_cut is None:
+            last_cut = int(frame_nums[0])
+        # Only frames above the threshold can be cuts, so the sequential rule runs over few candidates
+        for candidate in np.flatnonzero(np.asarray(scores) >= threshold):
+            frame_num = int(frame_nums[candidate])
+            if frame_num - last_cut >= min_scene_len:
+                yield frame_num
+                last_cut = frame_num
+
+def cuts_from_scores(scores, frame_nums, threshold=27.0, min_scene_len=15):
+    """
+    Apply ContentDetector's threshold and minimum-scene-length rules to a score array.
+
+    Args:
+        scores (numpy.ndarray): Content-change score of every scored frame.
+        frame_nums (numpy.ndarray): Frame number of every scored frame, increasing.
+        threshold (float): Score a frame must reach to start a new scene.
+        min_scene_len (int): Minimum number of frames between two cuts (and before the first one).
+
+    Returns:
+        list: Frame numbers of the cuts.
+    """
+    return list(iter_cuts([(scores, frame_nums)], threshold, min_scene_len))
+
+def read_sampled_batches(cap, frame_skip=0, batch_size=64, downscale_factor=1):
+    """
+    Decode and downscale every (frame_skip + 1)-th frame of a video, in batches.
+
+    Args:
+        cap (cv2.VideoCapture or EdlReader): Opened reader, positioned at the first frame.
+        frame_skip (int): Frames skipped (grabbed without color conversion) after every decoded frame.
+        batch_size (int): Number of decoded frames per batch.
+        downscale_factor (int): Downscale factor applied to the decoded frames.
+
+    Yields:
+        tuple: (frame_nums, frames, frames_read) with the frame numbers and the stacked frames of the
+            batch, and the number of frames read from the video so far.
+    """
+    frames_read = 0
+    finished = False
+    while not finished:
+        frame_nums = []
+        batch = []
+        while len(batch) < batch_size and not finished:
+            ret, frame = cap.read()
+            if not ret:
+                finished = True
+                break
+            frame_nums.append(frames_read)
+            batch.append(downscale_frame(frame, downscale_factor))
+            frames_read += 1
+            for _ in range(frame_skip):
+                if not cap.grab():
+                    finished = True
+                    break
+                frames_read += 1
+        if batch:
+            yield frame_nums, np.stack(batch), frames_read
+
+def iter_content_scores(cap, frame_skip=0, batch_size=64):
+    """
+    Content-change scores of a video, batch by batch, computed on downscaled HSV frames.
+
+    Decoding runs in a background thread (pipeline.prefetch), overlapping with scoring.
+
+    Args:
+        cap (cv2.VideoCapture or EdlReader): Opened reader, positioned at the first frame.
+        frame_skip (int): Frames skipped (grabbed without decoding) after every scored frame.
+        batch_size (int): Number of frames converted and scored together.
+
+    Yields:
+        tuple: (scores, frame_nums, frames_read). Scores compare every scored frame with the
+            previous scored one; `frames_read` counts the frames read from the video so far.
+    """
+    downscale_factor = compute_downscale_factor(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)))
+    prev_hsv = None
+    for frame_nums, frames, frames_read in prefetch(read_sampled_batches(cap, frame_skip, batch_size, downscale_factor)):
+        hsv_frames = batch_hsv(frames)
+        yield content_scores(hsv_frames, prev_hsv), np.array(frame_nums, dtype=np.int64), frames_read
+        prev_hsv = hsv_frames[-1]
+
+def score_video_content(cap, frame_skip=0, batch_size=64):
+    """
+    Content-change scores of a whole video (see iter_content_scores).
+
+    Returns:
+        tuple: (scores, frame_nums, total_frames).
+    """
+    scores = [np.empty(0)]
+    frame_nums = [np.empty(0, dtype=np.int64)]
+    total_frames = 0
+    for batch_scores, batch_frame_nums, total_frames in iter_content_scores(cap, frame_skip, batch_size):
+        scores.append(batch_scores)
+        frame_nums.append(batch_frame_nums)
+    return np.concatenate(scores), np.concatenate(frame_nums), total_frames
+
+def scene_list_from_cuts(cuts, total_frames, fps):
+    """
+    Build a scene list from cut frame numbers.
+
+    Returns:
+        list: (start, end) FrameTimecode tuples, like SceneManager.get_scene_list(). Empty if there is no cut.
+    """
+    if not cuts:
+        return []
+    cut_list = [FrameTimecode(cut, fps) for cut in cuts]
+    return get_scenes_from_cuts(cut_list, FrameTimecode(0, fps), FrameTimecode(total_frames, fps))
+
+def detect_scenes_native(cap, threshold=27.0, min_scene_len=15, frame_skip=0, batch_size=64):
+    """
+    Detect fast cuts like ContentDetector, with batched NumPy scoring instead of per-frame detector calls.
+
+    Args:
+        cap (cv2.VideoCapture or EdlReader): Opened reader, positioned at the first frame.
+        threshold (float): Score a frame must reach to start a new scene.
+        min_scene_len (int): Minimum scene length in frames.
+        frame_skip (int): Frames skipped after every scored frame; trades boundary accuracy for speed.
+        batch_size (int): Number of frames converted and scored together.
+
+    Returns:
+        list: (start, end) FrameTimecode tuples, like SceneManager.get_scene_list(). Empty if no cut was found.
+    """
+    scores, frame_nums, total_frames = score_video_content(cap, frame_skip, batch_size)
+    cuts = cuts_from_scores(scores, frame_nums, threshold, min_scene_len)
+    return scene_list_from_cuts(cuts, total_frames, cap.get(cv2.CAP_PROP_FPS))
+
+def iter_scenes_native(cap, threshold=27.0, min_scene_len=15, frame_skip=0, batch_size=64):
+    """
+    Streaming counterpart of detect_scenes_native: yield every scene as soon as its end is confirmed.
+
+    A scene ends at the next cut, so each scene is yielded once the batch holding that
+    cut is scored; the last scene ends with the video. Like detect_scenes_native,
+    nothing is yielded for a video without any cut.
+
+    Args:
+        cap (cv2.VideoCapture or EdlReader): Opened reader, positioned at the first frame.
+        threshold (float): Score a frame must reach to start a new scene.
+        min_scene_len (int): Minimum scene length in frames.
+        frame_skip (int): Frames skipped after every scored frame.
+        batch_size (int): Number of frames converted and scored together.
+
+    Yields:
+        tuple: (start, end) FrameTimecode of every scene, in order.
+    """
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    progress = {"frames_read": 0}
+
+    def scored_batches():
+        for scores, frame_nums, frames_read in iter_content_scores(cap, frame_skip, batch_size):
+            progress["frames_read"] = frames_read
+            yield scores, frame_nums
+
+    scene_start = None
+    for cut in iter_cuts(scored_batches(), threshold, min_scene_len):
+        yield FrameTimecode(0 if scene_start is None else scene_start, fps), FrameTimecode(cut, fps)
+        scene_start = cut
+    if scene_start is not None:
+        yield FrameTimecode(scene_start, fps), FrameTimecode(progress["frames_read"], fps)
+
+def refine_window_scores(cap, start, end, downscale_factor, batch_size=64):
+    """
+    Frame-accurate content-change scores of frames (start, end], decoded by seeking to `start`.
+
+    Args:
+        cap (cv2.VideoCapture or EdlReader): Opened reader.
+        start (int): Frame before the first scored frame.
+        end (int): Last scored frame.
+        downscale_factor (int): Downscale factor applied before scoring.
+        batch_size (int): Number of frames converted and scored together.
+
+    Returns:
+        tuple: (scores, frame_nums) of the frames actually decoded, at most end - start.
+    """
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    ret, frame = cap.read()
+    if not ret:
+        return np.empty(0), np.empty(0, dtype=np.int64)
+    prev_hsv = batch_hsv(downscale_frame(frame, downscale_factor)[np.newaxis])[0]
+
+    scores = []
+    frame_num = start + 1
+    while frame_num <= end:
+        batch = []
+        while len(batch) < batch_size and frame_num + len(batch) <= end:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            batch.append(downscale_frame(frame, downscale_factor))
+        if not batch:
+            break
+        hsv_frames = batch_hsv(np.stack(batch))
+        scores.append(content_scores(hsv_frames, prev_hsv))
+        prev_hsv = hsv_frames[-1]
+        frame_num += len(batch)
+
+    scores = np.concatenate(scores) if scores else np.empty(0)
+    return scores, np.arange(start + 1, start + 1 + len(scores), dtype=np.int64)
+
+def detect_scenes_coarse_to_fine(cap, threshold=27.0, min_scene_len=15, coarse_step=8, candidate_ratio=0.5, batch_size=64):
+    """
+    Detect fast cuts with a coarse pass over every `coarse_step`-th frame and a frame-accurate refinement.
+
+    The coarse pass compares frames `coarse_step` apart, skipping the frames in between
+    with grab() (no color conversion, no scoring). A cut between two samples shows up as a
+    large coarse score, so only windows scoring at least `candidate_ratio * threshold`,
+    plus the tail after the last sample, are decoded again by seeking and scored frame
+    by frame. Frames outside the windows are taken as non-cuts. The cuts then follow the
+    same threshold and minimum-length rules as detect_scenes_native.
+
+    This is approximate: the two samples around a cut only bound what happens between
+    them from below, so a cut is missed whenever they differ by less than
+    `candidate_ratio * threshold`. Besides flashes, that happens with scenes shorter
+    than `coarse_step` (a 1-frame scene between two similar shots scores its cut on the
+    shots around it, not on the frame itself) and with cuts between similar shots. A
+    lower `candidate_ratio` refines more windows; 0 refines all of them and finds exactly
+    the cuts of detect_scenes_native, at about its cost.
+
+    Args:
+        cap (cv2.VideoCapture or EdlReader): Opened reader, positioned at the first frame.
+        threshold (float): Score a frame must reach to start a new scene.
+        min_scene_len (int): Minimum scene length in frames.
+        coarse_step (int): Distance in frames between two coarse samples.
+        candidate_ratio (float): Fraction of `threshold` a coarse score must reach to be refined.
+        batch_size (int): Number of frames converted and scored together.
+
+    Returns:
+        list: (start, end) FrameTimecode tuples, like SceneManager.get_scene_list(). Empty if no cut was found.
+    """
+    downscale_factor = compute_downscale_factor(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)))
+    coarse_scores, coarse_frame_nums, total_frames = score_video_content(cap, coarse_step - 1, batch_size)
+    if total_frames == 0:
+        return []
+
+    windows = [(int(coarse_frame_nums[i - 1]), int(coarse_frame_nums[i]))
+               for i in np.flatnonzero(coarse_scores >= candidate_ratio * threshold) if i > 0]
+    if coarse_frame_nums[-1] < total_frames - 1:
+        windows.append((int(coarse_frame_nums[-1]), total_frames - 1))
+
+    # Consecutive candidate windows share an end frame; refine them in one seek
+    merged = []
+    for start, end in windows:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+
+    # Frame 0 anchors the minimum scene length like in the exhaustive pass
+    scores = [np.zeros(1)]
+    frame_nums = [np.zeros(1, dtype=np.int64)]
+    for start, end in merged:
+        window_scores, window_frame_nums = refine_window_scores(cap, start, end, downscale_factor, batch_size)
+        scores.append(window_scores)
+        frame_nums.append(window_frame_nums)
+
+    cuts = cuts_from_scores(np.concatenate(scores), np.concatenate(frame_nums), threshold, min_scene_len)
+    return scene_list_from_cuts(cuts, total_frames, cap.get(cv2.CAP_PROP_FPS))
+
+def write_scene_list(scene_list, fps, output_scene_list_path, timeline_path):
+    """
+    Save a scene list as a binary timeline, plus its text export in the timeline log format.
+
+    Args:
+        scene_list (list): (start, end) FrameTimecode tuples.
+        fps (float): Frame rate of the video.
+        output_scene_list_path (str): Path of the text timeline log.
+        timeline_path (str): Path of the binary timeline (see scene_timeline.Timeline).
+
+    Returns:
+        Timeline: The saved timeline.
+    """
+    timeline = Timeline.from_scene_list(scene_list, fps)
+    write_timeline(timeline, output_scene_list_path, timeline_path)
+    return timeline
+
+def write_timeline(timeline, output_scene_list_path, timeline_path):
+    """
+    Save a timeline, plus its text export in the timeline log format.
+
+    Args:
+        timeline (Timeline): Detected scenes.
+        output_scene_list_path (str): Path of the text timeline log.
+        timeline_path (str): Path of the binary timeline.
+    """
+    timeline.save(timeline_path)
+    with open(output_scene_list_path, 'w') as f:
+        f.write(timeline.to_text())
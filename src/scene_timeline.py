@@ -0,0 +1,114 @@
+import numpy as np
+from scenedetect.frame_timecode import FrameTimecode
+
+TIMELINE_SUFFIX = ".npz"
+
+class Timeline:
+    """
+    Detected scenes of a video, stored as sorted arrays of exact frame numbers.
+
+    Scene i covers frames [starts[i], ends[i]). Scenes are in order and never overlap, so
+    finding the scene shown at a given time is a binary search over the scene starts.
+
+    Saved as a NumPy .npz archive holding the frame rate and both frame arrays; the
+    "Scene i: Start frame HH:MM:SS.mmm - End frame HH:MM:SS.mmm" text log is an export view (to_text).
+
+    Args:
+        fps (float): Frame rate of the video.
+        starts (numpy.ndarray): First frame of every scene.
+        ends (numpy.ndarray): Frame after the last frame of every scene.
+    """
+
+    def __init__(self, fps, starts, ends):
+        self.fps = fps
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        # Scene boundaries in seconds, computed once so scene_at stays a binary search
+        self.start_times = self.starts / fps
+        self.end_times = self.ends / fps
+
+    @classmethod
+    def from_scene_list(cls, scene_list, fps):
+        """
+        Build the timeline from a scene list.
+
+        Args:
+            scene_list (Iterable): (start, end) FrameTimecode tuples, like SceneManager.get_scene_list().
+            fps (float): Frame rate of the video.
+
+        Returns:
+            Timeline: The scenes.
+        """
+        frames = np.array([(start.get_frames(), end.get_frames()) for start, end in scene_list], dtype=np.int64).reshape(-1, 2)
+        return cls(fps, frames[:, 0], frames[:, 1])
+
+    @classmethod
+    def from_text(cls, text, fps):
+        """
+        Parse a timeline exported with to_text().
+
+        Timecodes are rounded to the nearest frame, which recovers the exact frame
+        numbers from the millisecond timecodes at any common frame rate.
+
+        Args:
+            text (str): Contents of the text timeline log.
+            fps (float): Frame rate of the video.
+
+        Returns:
+            Timeline: The scenes.
+        """
+        scene_list = []
+        for line in text.splitlines():
+            if line.startswith("Scene"):
+                parts = line.split()
+                scene_list.append((FrameTimecode(parts[4], fps), FrameTimecode(parts[-1], fps)))
+        return cls.from_scene_list(scene_list, fps)
+
+    @classmethod
+    def load(cls, timeline_path):
+        """Load a timeline saved with save()."""
+        with np.load(timeline_path) as data:
+            return cls(float(data["fps"]), data["starts"], data["ends"])
+
+    def save(self, timeline_path):
+        """Save the timeline as a .npz archive."""
+        # Through a file object, so numpy doesn't append its own suffix to the path
+        with open(timeline_path, 'wb') as f:
+            np.savez(f, fps=self.fps, starts=self.starts, ends=self.ends)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        """Yield (start_frame, end_frame) of every scene."""
+        return zip(self.starts.tolist(), self.ends.tolist())
+
+    def scene_at(self, time):
+        """
+        Which scene is shown at a given time.
+
+        The time is compared with the scene boundaries in seconds: int(time * fps) would
+        truncate a boundary like 1001 / 29.97 to the last frame of the previous scene.
+
+        Args:
+            time (float): Time in seconds.
+
+        Returns:
+            int: Index of the scene, -1 if no scene covers the time.
+        """
+        scene = np.searchsorted(self.start_times, time, side='right') - 1
+        if scene < 0 or time >= self.end_times[scene]:
+            return -1
+        return int(scene)
+
+    def to_text(self):
+        """
+        Human-readable timeline, one line per scene.
+
+        Returns:
+            str: The scenes in the text timeline log format.
+        """
+        return "".join(
+            f"Scene {i + 1}: Start frame {FrameTimecode(start, self.fps)} - End frame {FrameTimecode(end, self.fps)}\n"
+            for i, (start, end) in enumerate(self)
+        )
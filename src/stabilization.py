@@ -0,0 +1,186 @@
+import cv2
+import numpy as np
+from collections import deque
+
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def estimate_transform(prev_gray, gray, max_corners=200):
+    """
+    Estimate the global camera motion between two frames from sparse feature tracks.
+
+    A few hundred corners are tracked with pyramidal Lucas-Kanade and a similarity
+    transform (translation, rotation, uniform scale) is fitted to them with RANSAC.
+
+    Args:
+        prev_gray (numpy.ndarray): Previous grayscale frame.
+        gray (numpy.ndarray): Current grayscale frame.
+        max_corners (int): Maximum number of features to track.
+
+    Returns:
+        numpy.ndarray: (dx, dy, da) translation in pixels and rotation in radians. Zero when
+            too few features can be tracked (e.g. flat or black frames).
+    """
+    prev_points = cv2.goodFeaturesToTrack(prev_gray, maxCorners=max_corners, qualityLevel=0.01, minDistance=20, blockSize=3)
+    if prev_points is None or len(prev_points) < 4:
+        return np.zeros(3)
+
+    points, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, prev_points, None)
+    tracked = status.ravel() == 1
+    if tracked.sum() < 4:
+        return np.zeros(3)
+
+    matrix, _ = cv2.estimateAffinePartial2D(prev_points[tracked], points[tracked])
+    if matrix is None:
+        return np.zeros(3)
+    return np.array([matrix[0, 2], matrix[1, 2], np.arctan2(matrix[1, 0], matrix[0, 0])])
+
+def batch_transforms(gray_frames, prev_gray=None, max_corners=200):
+    """
+    Global motion of every frame of a batch against its predecessor.
+
+    Args:
+        gray_frames (numpy.ndarray): Grayscale frames (N, H, W).
+        prev_gray (numpy.ndarray, optional): Grayscale frame preceding the batch.
+        max_corners (int): Maximum number of features to track.
+
+    Returns:
+        numpy.ndarray: (N, 3) array of (dx, dy, da). The first frame of the video gets zeros.
+    """
+    transforms = np.zeros((len(gray_frames), 3))
+    for i, gray_frame in enumerate(gray_frames):
+        if prev_gray is not None:
+            transforms[i] = estimate_transform(prev_gray, gray_frame, max_corners)
+        prev_gray = gray_frame
+    return transforms
+
+def shake_scores(transforms, prev_transform, frame_size):
+    """
+    Score camera shake from the jitter of the global motion.
+
+    A steady pan has a constant per-frame transform; shake shows up as frame-to-frame
+    changes of it. The score is how far that change moves the frame corners, in
+    thousandths of the frame diagonal, so it means the same thing at every resolution.
+
+    Args:
+        transforms (numpy.ndarray): (N, 3) per-frame (dx, dy, da).
+        prev_transform (numpy.ndarray, optional): Transform of the frame preceding the batch.
+        frame_size (tuple): (width, height) of the frames the transforms were measured on.
+
+    Returns:
+        numpy.ndarray: float64 array of shape (N,).
+    """
+    diagonal = np.hypot(*frame_size)
+    if prev_transform is None:
+        prev_transform = transforms[:1]
+    previous = np.vstack([np.reshape(prev_transform, (1, 3)), transforms[:-1]])
+    jitter = transforms - previous
+
+    corner_shift = np.hypot(jitter[:, 0], jitter[:, 1]) + np.abs(jitter[:, 2]) * diagonal / 2
+    return corner_shift / diagonal * 1000
+
+def smooth_trajectory(transforms, radius):
+    """
+    Smooth the camera trajectory with a centered moving average.
+
+    Args:
+        transforms (numpy.ndarray): (N, 3) per-frame (dx, dy, da).
+        radius (int): Number of frames on each side of the averaging window.
+
+    Returns:
+        numpy.ndarray: (N, 3) per-frame transforms that follow the smoothed trajectory.
+    """
+    trajectory = np.cumsum(transforms, axis=0)
+    kernel = np.ones(2 * radius + 1) / (2 * radius + 1)
+    padded = np.pad(trajectory, ((radius, radius), (0, 0)), mode='edge')
+    smoothed = np.stack([np.convolve(padded[:, i], kernel, mode='valid') for i in range(3)], axis=1)
+    return transforms + smoothed - trajectory
+
+def warp_frame(frame, correction, zoom=1.04):
+    """
+    Move a frame back onto the smoothed trajectory.
+
+    Args:
+        frame (numpy.ndarray): BGR frame.
+        correction (numpy.ndarray): (dx, dy, da) offset from the measured to the smoothed trajectory.
+        zoom (float): Slight zoom hiding the borders uncovered by the warp.
+
+    Returns:
+        numpy.ndarray: Warped frame of the same size.
+    """
+    height, width = frame.shape[:2]
+    dx, dy, da = correction
+    matrix = np.array([[np.cos(da), -np.sin(da), dx],
+                       [np.sin(da), np.cos(da), dy],
+                       [0, 0, 1]])
+    zoom_matrix = np.vstack([cv2.getRotationMatrix2D((width / 2, height / 2), 0, zoom), [0, 0, 1]])
+    return cv2.warpAffine(frame, (zoom_matrix @ matrix)[:2], (width, height))
+
+class Stabilizer:
+    """
+    Stabilize the output while it is written, from the global motion measured by the filters.
+
+    The camera trajectory is the running sum of the per-frame transforms of every decoded
+    frame, so frames dropped between two kept frames still count. Kept frames are warped
+    from their place on it to its centered moving average (as smooth_trajectory computes),
+    which needs the `smoothing_radius` kept frames after them: frames are held back that
+    long, so about smoothing_radius + 1 frames stay in memory.
+
+    Args:
+        smoothing_radius (int): Number of kept frames on each side of the averaging window.
+    """
+
+    def __init__(self, smoothing_radius=15):
+        self.radius = smoothing_radius
+        self.position = np.zeros(3)  # Trajectory position of the last decoded frame
+        self.window = deque()  # Trajectory positions of the averaging window, edge-padded like smooth_trajectory
+        self.pending = deque()  # (frame, position) of kept frames not written yet
+
+    def add_batch(self, frames, keep_mask, transforms):
+        """
+        Add a scored batch.
+
+        Args:
+            frames (numpy.ndarray): Batch of BGR frames (N, H, W, 3).
+            keep_mask (numpy.ndarray): Frames that go to the output.
+            transforms (numpy.ndarray): (N, 3) global motion of every frame against its predecessor.
+
+        Returns:
+            list: Stabilized frames ready to be written, in output order.
+        """
+        positions = self.position + np.cumsum(transforms, axis=0)
+        if len(positions):
+            self.position = positions[-1]
+
+        ready = []
+        for frame, position in zip(frames[keep_mask], positions[keep_mask]):
+            if not self.window:
+                # The window before the first frame repeats its position
+                self.window.extend([position] * self.radius)
+            self.window.append(position)
+            self.pending.append((frame, position))
+            if len(self.window) == 2 * self.radius + 1:
+                ready.append(self._emit())
+        return ready
+
+    def flush(self):
+        """
+        Stabilized frames still held back, once the last batch was added.
+
+        Returns:
+            list: Remaining stabilized frames, in output order.
+        """
+        ready = []
+        while self.pending:
+            # The window after the last frame repeats its position
+            while len(self.window) < 2 * self.radius + 1:
+                self.window.append(self.window[-1])
+            ready.append(self._emit())
+        return ready
+
+    def _emit(self):
+        frame, position = self.pending.popleft()
+        correction = np.mean(self.window, axis=0) - position
+        self.window.popleft()
+        return warp_frame(frame, correction)
@@ -0,0 +1,263 @@
+import cv2
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import numpy as np
+
+from video_io import find_ffmpeg
+
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ffmpeg encoder used for the re-encoded clip heads and tails, by source codec
+ENCODERS = {"h264": "libx264", "hevc": "libx265", "mpeg4": "mpeg4", "vp9": "libvpx-vp9", "av1": "libaom-av1"}
+
+def keyframe_times(ffmpeg_path, video_path):
+    """
+    Presentation times of the keyframes of the first video stream.
+
+    ffprobe lists them from the packet flags without decoding anything; without
+    ffprobe, ffmpeg decodes the keyframes only (-skip_frame nokey).
+
+    Args:
+        ffmpeg_path (str): Path to the ffmpeg executable.
+        video_path (str): Path to the video.
+
+    Returns:
+        numpy.ndarray: Keyframe times in seconds, sorted.
+    """
+    ffprobe_path = shutil.which("ffprobe")
+    if ffprobe_path is not None:
+        result = subprocess.run([ffprobe_path, "-v", "error", "-select_streams", "v:0", "-show_entries", "packet=pts_time,flags",
+                                 "-of", "csv=p=0", video_path], capture_output=True, text=True, check=True)
+        times = [float(line.split(',')[0]) for line in result.stdout.splitlines()
+                 if 'K' in line.split(',')[-1] and line.split(',')[0] not in ("", "N/A")]
+    else:
+        result = subprocess.run([ffmpeg_path, "-hide_banner", "-skip_frame", "nokey", "-i", video_path, "-map", "0:v:0",
+                                 "-vf", "showinfo", "-f", "null", "-"], capture_output=True, text=True, check=True)
+        times = [float(value) for value in re.findall(r"pts_time:\s*(-?[\d.]+)", result.stderr)]
+    return np.sort(np.array(times))
+
+# Encoder profile names of the profiles ffmpeg reports, for the encoders that take one
+PROFILES = {
+    "libx264": {"Constrained Baseline": "baseline", "Baseline": "baseline", "Main": "main", "High": "high",
+                "High 10": "high10", "High 4:2:2": "high422", "High 4:4:4 Predictive": "high444"},
+    "libx265": {"Main": "main", "Main 10": "main10", "Main Still Picture": "mainstillpicture"},
+}
+
+# Stream parameters the re-encoded segments must share with the copied ones to be joined
+STREAM_PARAMETERS = ("codec_name", "profile", "level", "pix_fmt", "width", "height")
+
+def stream_parameters(ffmpeg_path, video_path):
+    """
+    Codec parameters of the first video stream of a file.
+
+    ffprobe reports all of them; without ffprobe they are parsed from `ffmpeg -i`, which
+    doesn't show the level (left None).
+
+    Args:
+        ffmpeg_path (str): Path to the ffmpeg executable.
+        video_path (str): Path to the video.
+
+    Returns:
+        dict: STREAM_PARAMETERS plus 'time_base' (the track timescale, e.g. 15360), None where unknown.
+    """
+    parameters = dict.fromkeys(STREAM_PARAMETERS + ("time_base",))
+    ffprobe_path = shutil.which("ffprobe")
+    if ffprobe_path is not None:
+        result = subprocess.run([ffprobe_path, "-v", "error", "-select_streams", "v:0", "-show_entries",
+                                 f"stream={','.join(STREAM_PARAMETERS)},time_base", "-of", "default=nw=1", video_path],
+                                capture_output=True, text=True, check=True)
+        for line in result.stdout.splitlines():
+            key, _, value = line.partition('=')
+            if key in parameters and value not in ("", "unknown", "N/A"):
+                parameters[key] = value
+        if parameters["time_base"] is not None:
+            parameters["time_base"] = parameters["time_base"].split('/')[-1]
+        return parameters
+
+    result = subprocess.run([ffmpeg_path, "-hide_banner", "-i", video_path], capture_output=True, text=True)
+    match = re.search(r"Stream #\S+.*?: Video: (\w+)(?: \(([^)]+)\))?.*?, (\w+)(?:\([^)]*\))?, (\d+)x(\d+)", result.stderr)
+    if match:
+        parameters.update(codec_name=match.group(1), pix_fmt=match.group(3), width=match.group(4), height=match.group(5))
+        # The profile is the first parenthesis unless that one is the codec tag, e.g. (avc1 / 0x31637661)
+        if match.group(2) is not None and '/' not in match.group(2):
+            parameters["profile"] = match.group(2)
+    match = re.search(r"Video: .*?(\d+) tbn", result.stderr)
+    if match:
+        parameters["time_base"] = match.group(1)
+    return parameters
+
+def encoder_options(encoder, parameters):
+    """
+    ffmpeg options making an encoder produce segments that can be joined with the source's packets.
+
+    Args:
+        encoder (str): ffmpeg encoder matching the source codec (see ENCODERS).
+        parameters (dict): Source stream parameters (see stream_parameters).
+
+    Returns:
+        list: ffmpeg arguments.
+    """
+    options = ["-c:v", encoder]
+    if parameters["pix_fmt"] is not None:
+        options += ["-pix_fmt", parameters["pix_fmt"]]
+    profile = PROFILES.get(encoder, {}).get(parameters["profile"])
+    if profile is not None:
+        # Other profiles are left to the encoder; the segment check then re-encodes the whole clip
+        options += ["-profile:v", profile]
+    if encoder == "libx264" and parameters["level"] is not None:
+        # H.264 levels are reported times ten (31 is level 3.1)
+        options += ["-level:v", f"{int(parameters['level']) / 10:g}"]
+    return options
+
+def stream_copy_segments(start_frame, end_frame, keyframes, num_frames=None):
+    """
+    Split a clip into a re-encoded head, a stream-copied middle and a re-encoded tail.
+
+    The middle spans the GOPs fully inside the clip: from its first keyframe to the last GOP
+    boundary at or before its end, where a keyframe at `end_frame` itself (scene cuts usually
+    are keyframes) or the end of the stream close a GOP. The head is the partial GOP before
+    the middle and the tail the partial GOP after it.
+
+    Args:
+        start_frame (int): First frame of the clip.
+        end_frame (int): Frame after the last frame of the clip.
+        keyframes (numpy.ndarray): Frame indices of the keyframes, sorted.
+        num_frames (int, optional): Number of frames of the stream, whose end closes the last GOP.
+
+    Returns:
+        list: (start_frame, end_frame, copy) of the non-empty segments, in order.
+    """
+    boundaries = keyframes if num_frames is None else np.append(keyframes, num_frames)
+    inside = boundaries[(boundaries >= start_frame) & (boundaries <= end_frame)]
+    if len(inside) < 2:
+        # No whole GOP inside the clip: re-encode it all
+        return [(start_frame, end_frame, False)]
+    segments = [(start_frame, int(inside[0]), False), (int(inside[0]), int(inside[-1]), True), (int(inside[-1]), end_frame, False)]
+    return [segment for segment in segments if segment[1] > segment[0]]
+
+def write_segment(ffmpeg_path, video_path, segment_start, segment_end, copy, segment_path, fps, encoder_args):
+    """
+    Write frames [segment_start, segment_end) of the source as a segment, copied or re-encoded.
+
+    Args:
+        ffmpeg_path (str): Path to the ffmpeg executable.
+        video_path (str): Path to the source video.
+        segment_start (int): First frame of the segment.
+        segment_end (int): Frame after the last frame of the segment.
+        copy (bool): Copy the packets instead of re-encoding them.
+        segment_path (str): Path of the segment to write (.mp4).
+        fps (float): Frame rate of the source video.
+        encoder_args (list): ffmpeg options of the re-encoded segments (see encoder_options).
+    """
+    # Copied segments seek half a frame past their keyframe (ffmpeg copies from the keyframe
+    # before the seek point); re-encoded ones half a frame early (decoded frames before it are dropped)
+    seek = ["-ss", f"{max(segment_start + (0.5 if copy else -0.5), 0) / fps:.6f}"]
+    codec = ["-c:v", "copy", "-avoid_negative_ts", "make_zero"] if copy else encoder_args
+    subprocess.run([ffmpeg_path, "-y", "-loglevel", "error", *seek, "-i", video_path, "-map", "0:v:0", "-an",
+                    "-frames:v", str(segment_end - segment_start), *codec, segment_path], check=True)
+
+def export_clip_stream_copy(ffmpeg_path, video_path, start_frame, end_frame, clip_path, fps, keyframes, encoder,
+                            parameters, num_frames=None):
+    """
+    Export one clip, copying its whole GOPs and re-encoding only the partial ones at its ends.
+
+    The re-encoded segments use the source's profile, level and pixel format. If the encoder
+    can't match them (checked on the written segments), the clip is re-encoded as a whole
+    rather than joining incompatible streams. The segments are joined with ffmpeg's concat
+    demuxer, which moves H.264/HEVC parameter sets in-band (auto_convert), so each segment
+    keeps decoding with its own encoder's parameter sets; then the source audio of the clip's time range is copied alongside. Segments
+    are cut by frame count, so the clip holds exactly frames [start_frame, end_frame) of the source.
+
+    Args:
+        ffmpeg_path (str): Path to the ffmpeg executable.
+        video_path (str): Path to the source video.
+        start_frame (int): First frame of the clip.
+        end_frame (int): Frame after the last frame of the clip.
+        clip_path (str): Path of the clip to write.
+        fps (float): Frame rate of the source video.
+        keyframes (numpy.ndarray): Frame indices of the keyframes of the source, sorted.
+        encoder (str): ffmpeg encoder matching the source codec, for the re-encoded segments.
+        parameters (dict): Source stream parameters (see stream_parameters).
+        num_frames (int, optional): Number of frames of the source.
+
+    Returns:
+        int: Number of stream-copied frames (0 if the clip was re-encoded as a whole).
+    """
+    encoder_args = encoder_options(encoder, parameters)
+    segments = stream_copy_segments(start_frame, end_frame, keyframes, num_frames)
+    segment_dir = tempfile.mkdtemp()
+    try:
+        segment_paths = []
+        for i, (segment_start, segment_end, copy) in enumerate(segments):
+            segment_path = os.path.join(segment_dir, f"segment_{i}.mp4")
+            write_segment(ffmpeg_path, video_path, segment_start, segment_end, copy, segment_path, fps, encoder_args)
+            segment_paths.append(segment_path)
+
+        if any(copy for _, _, copy in segments):
+            mismatched = [key for segment_path, (_, _, copy) in zip(segment_paths, segments) if not copy
+                          for key, value in stream_parameters(ffmpeg_path, segment_path).items()
+                          if key in STREAM_PARAMETERS and value != parameters[key]]
+            if mismatched:
+                logger.warning(f"Re-encoded segments differ from the source in {', '.join(sorted(set(mismatched)))}; "
+                               f"re-encoding the whole clip {clip_path}.")
+                segments = [(start_frame, end_frame, False)]
+                segment_paths = [os.path.join(segment_dir, "clip.mp4")]
+                write_segment(ffmpeg_path, video_path, start_frame, end_frame, False, segment_paths[0], fps, encoder_args)
+
+        list_path = os.path.join(segment_dir, "segments.txt")
+        with open(list_path, 'w') as list_file:
+            for segment_path in segment_paths:
+                list_file.write(f"file '{segment_path}'\n")
+
+        # Same track timescale as the source; the clip's audio is copied straight from the source,
+        # audio frames are short enough to cut anywhere
+        timescale = [] if parameters["time_base"] is None else ["-video_track_timescale", parameters["time_base"]]
+        subprocess.run([ffmpeg_path, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path,
+                        "-ss", f"{start_frame / fps:.6f}", "-t", f"{(end_frame - start_frame) / fps:.6f}", "-i", video_path,
+                        "-map", "0:v:0", "-map", "1:a?", "-c", "copy", *timescale, clip_path], check=True)
+    finally:
+        shutil.rmtree(segment_dir)
+    return sum(end - start for start, end, copy in segments if copy)
+
+def export_clips_stream_copy(video_path, scene_frames, output_shorts_path, fps):
+    """
+    Write one clip per scene with stream copy (see export_clip_stream_copy).
+
+    Args:
+        video_path (str): Path to the source video; must be a real video file, not an edit decision list.
+        scene_frames (Iterable): (start_frame, end_frame) of every scene, end excluded.
+        output_shorts_path (str): Directory the clips are written to.
+        fps (float): Frame rate of the source video.
+
+    Yields:
+        str: Path of every clip once it is written.
+
+    Raises:
+        RuntimeError: If ffmpeg isn't available or the source codec has no known encoder.
+    """
+    ffmpeg_path = find_ffmpeg()
+    if ffmpeg_path is None:
+        raise RuntimeError("Stream-copy export needs ffmpeg.")
+    parameters = stream_parameters(ffmpeg_path, video_path)
+    codec = parameters["codec_name"]
+    if codec not in ENCODERS:
+        raise RuntimeError(f"Stream-copy export can't re-encode the partial GOPs of {codec} video.")
+
+    times = keyframe_times(ffmpeg_path, video_path)
+    # Keyframe frame indices, counted from the first frame of the stream
+    keyframes = np.round((times - times[0]) * fps).astype(np.int64) if len(times) else np.empty(0, dtype=np.int64)
+    cap = cv2.VideoCapture(video_path)
+    num_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    for i, (start_frame, end_frame) in enumerate(scene_frames):
+        clip_path = os.path.join(output_shorts_path, f'clip_{i + 1}.mp4')
+        copied_frames = export_clip_stream_copy(ffmpeg_path, video_path, start_frame, end_frame, clip_path, fps, keyframes,
+                                                ENCODERS[codec], parameters, num_frames or None)
+        logger.info(f"{clip_path}: {copied_frames} of {end_frame - start_frame} frames stream-copied")
+        yield clip_path
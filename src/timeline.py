@@ -1,3 +1,4 @@
+import cv2
 from scenedetect import VideoManager
 from scenedetect import SceneManager
 from scenedetect.detectors import ContentDetector
@@ -5,6 +6,11 @@ import argparse
 from omegaconf import OmegaConf
 import os
 
+from edit_decision_list import EDL_SUFFIX, open_video, preprocessed_video_path
+from parallel_scene_detection import detect_scenes_parallel
+from scene_detection import detect_scenes, detect_scenes_coarse_to_fine, detect_scenes_native, write_scene_list, write_timeline
+from timeline_cache import CACHE_PARAMS, TimelineCache
+
 import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,24 +26,72 @@ def main(args):
 
     """
     config = OmegaConf.load(f"../config/{args.config}.yaml")
-    input_video_path = config.path.data.preprocessing_output
+    input_video_path = preprocessed_video_path(config)
     output_scene_list_path = config.path.log.timeline_log
+    timeline_path = config.path.log.timeline_index
+
+    if config.preprocessing.detect_scenes:
+        # Preprocessing already detected the scenes on the frames it decoded
+        logger.info(f"🔥 Scene list was written by preprocessing: {output_scene_list_path}")
+        return
 
     # Create the output directory if it doesn't exist.
     os.makedirs(output_scene_list_path[:7], exist_ok=True)
 
     print(output_scene_list_path[:7])
-    video_manager = VideoManager([input_video_path])
-
-    # Create a SceneManager and add ContentDetector to it.
-    scene_manager = SceneManager()
-    scene_manager.add_detector(ContentDetector())
-    # Set the video manager and scene manager to process the video.
-    video_manager.set_downscale_factor()
-    logger.info("🔥 Scene detection starts.")
-    video_manager.start() # Start the video manager.
-    scene_manager.detect_scenes(frame_source=video_manager) # Perform scene detection.
-    scene_list = scene_manager.get_scene_list() # Create the scene list.
+    # Frame rate of the video the scene frame numbers refer to
+    cap = open_video(input_video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+
+    detection = config.timeline
+    cache = None
+    if detection.cache:
+        # Same video content and detector parameters: reuse the stored scenes instead of detecting again
+        cache = TimelineCache(detection.cache_dir, detection.cache_entries)
+        cache_key = TimelineCache.key(input_video_path, {name: detection[name] for name in CACHE_PARAMS})
+        timeline = cache.get(cache_key)
+        if timeline is not None:
+            write_timeline(timeline, output_scene_list_path, timeline_path)
+            logger.info(f"🔥 Scene list loaded from the timeline cache: {len(timeline)} scenes.")
+            return
+
+    if detection.detector == "native" and detection.workers > 1 and detection.frame_skip == 0:
+        # Time ranges are scored in a process pool; cuts are decided once over the stitched scores
+        logger.info("🔥 Scene detection starts.")
+        scene_list = detect_scenes_parallel(input_video_path, detection.threshold, detection.min_scene_len, detection.workers, detection.batch_size)
+    elif detection.detector == "native":
+        # Batched NumPy scoring; reads videos and edit decision lists alike
+        logger.info("🔥 Scene detection starts.")
+        cap = open_video(input_video_path)
+        scene_list = detect_scenes_native(cap, detection.threshold, detection.min_scene_len, detection.frame_skip, detection.batch_size)
+        cap.release()
+    elif detection.detector == "coarse":
+        # Only windows where the coarse pass sees a large change are decoded frame by frame
+        logger.info("🔥 Scene detection starts.")
+        cap = open_video(input_video_path)
+        scene_list = detect_scenes_coarse_to_fine(cap, detection.threshold, detection.min_scene_len, detection.coarse_step,
+                                                  detection.candidate_ratio, detection.batch_size)
+        cap.release()
+    elif input_video_path.endswith(EDL_SUFFIX):
+        # Preprocessing wasn't materialized: detect scenes on the kept frames read straight from the input
+        logger.info("🔥 Scene detection starts.")
+        cap = open_video(input_video_path)
+        scene_list = detect_scenes(cap, ContentDetector(detection.threshold, detection.min_scene_len))
+        cap.release()
+    else:
+        video_manager = VideoManager([input_video_path])
+
+        # Create a SceneManager and add ContentDetector to it.
+        scene_manager = SceneManager()
+        scene_manager.add_detector(ContentDetector(detection.threshold, detection.min_scene_len))
+        # Set the video manager and scene manager to process the video.
+        video_manager.set_downscale_factor()
+        logger.info("🔥 Scene detection starts.")
+        video_manager.start() # Start the video manager.
+        scene_manager.detect_scenes(frame_source=video_manager) # Perform scene detection.
+        scene_list = scene_manager.get_scene_list() # Create the scene list.
+        video_manager.release() # Release the video manager.
     # TODO: 
     # 1. By using Google Speech-to-Text API, convert speech into text
     # 2. Summarize the alternative text for each timeline
@@ -47,12 +101,11 @@ def main(args):
     # For example, use Tesseract OCR to extract text displayed on the screen.
     
     
-    # Print the scene list.
-    with open(output_scene_list_path, 'w') as f:
-        for i, scene in enumerate(scene_list):
-            f.write(f"Scene {i + 1}: Start frame {scene[0]} - End frame {scene[1]}\n")
+    # Save the exact scene frames, plus the text export of the scene list.
+    timeline = write_scene_list(scene_list, fps, output_scene_list_path, timeline_path)
+    if cache is not None:
+        cache.put(cache_key, timeline)
 
-    video_manager.release() # Release the video manager.
     logger.info("🔥 Scene detection ended.")
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+
+from edit_decision_list import EDL_SUFFIX, EditDecisionList
+from frame_metrics import content_hash
+from scene_timeline import TIMELINE_SUFFIX, Timeline
+
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Settings of config.timeline that change the detected scenes (the others only change speed)
+CACHE_PARAMS = ("detector", "threshold", "min_scene_len", "frame_skip", "coarse_step", "candidate_ratio")
+
+def video_digest(video_path):
+    """
+    Sampled content hash of a video, or of an edit decision list and the source video it reads.
+
+    Args:
+        video_path (str): Path to the video, or to an edit decision list.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = content_hash(video_path)
+    if video_path.endswith(EDL_SUFFIX):
+        # The list only names its source, so the source content is part of the key too
+        digest += content_hash(EditDecisionList.load(video_path).source_path)
+    return digest
+
+class TimelineCache:
+    """
+    Scene timelines stored on disk, keyed by video content and detector parameters.
+
+    Every entry is a Timeline .npz file named after its key. Reading an entry refreshes
+    its modification time, and once the cache holds more than `max_entries` files the
+    least recently used ones are deleted.
+
+    Args:
+        cache_dir (str): Directory holding the entries.
+        max_entries (int): Maximum number of timelines kept.
+    """
+
+    def __init__(self, cache_dir, max_entries=64):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    @staticmethod
+    def key(video_path, params):
+        """
+        Cache key of a detection run.
+
+        Args:
+            video_path (str): Path to the video, or to an edit decision list.
+            params (dict): Detector parameters that change the result.
+
+        Returns:
+            str: Hex digest of the video content and the parameters.
+        """
+        digest = hashlib.blake2b(video_digest(video_path).encode(), digest_size=16)
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + TIMELINE_SUFFIX)
+
+    def get(self, key):
+        """
+        Look up a timeline.
+
+        Args:
+            key (str): Cache key (see key()).
+
+        Returns:
+            Timeline: The stored timeline, or None on a miss.
+        """
+        entry_path = self._entry_path(key)
+        if not os.path.exists(entry_path):
+            return None
+        # Mark the entry as recently used
+        os.utime(entry_path)
+        return Timeline.load(entry_path)
+
+    def put(self, key, timeline):
+        """
+        Store a timeline, evicting the least recently used entries beyond max_entries.
+
+        Args:
+            key (str): Cache key (see key()).
+            timeline (Timeline): Detected scenes.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_path = self._entry_path(key)
+        # Written aside and renamed, so a concurrent reader never sees a partial entry
+        temp_path = f"{entry_path}.{os.getpid()}.tmp"
+        timeline.save(temp_path)
+        os.replace(temp_path, entry_path)
+
+        entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(TIMELINE_SUFFIX)]
+        if len(entries) > self.max_entries:
+            entries.sort(key=os.path.getmtime)
+            for stale_path in entries[:len(entries) - self.max_entries]:
+                try:
+                    os.remove(stale_path)
+                except FileNotFoundError:
+                    # Already evicted by another process
+                    pass
+            logger.info(f"Evicted {len(entries) - self.max_entries} timelines from {self.cache_dir}")
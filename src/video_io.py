@@ -0,0 +1,67 @@
+import cv2
+import os
+import shutil
+import subprocess
+import tempfile
+
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def find_ffmpeg():
+    """
+    Locate an ffmpeg binary, either on PATH or the one bundled with imageio-ffmpeg.
+
+    Returns:
+        str: Path to the ffmpeg executable, or None if none is available.
+    """
+    ffmpeg_path = shutil.which("ffmpeg")
+    if ffmpeg_path is not None:
+        return ffmpeg_path
+
+    try:
+        import imageio_ffmpeg
+    except ImportError:
+        return None
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+def concat_videos(input_paths, output_path):
+    """
+    Concatenate videos with identical codec and frame size into one file, in order.
+
+    ffmpeg's concat demuxer is used to copy the packets without re-encoding when
+    available; otherwise the inputs are decoded and re-encoded with OpenCV.
+
+    Args:
+        input_paths (list): Paths of the videos to concatenate.
+        output_path (str): Path of the concatenated video.
+    """
+    ffmpeg_path = find_ffmpeg()
+    if ffmpeg_path is not None:
+        with tempfile.NamedTemporaryFile('w', suffix=".txt", delete=False) as list_file:
+            for input_path in input_paths:
+                list_file.write(f"file '{os.path.abspath(input_path)}'\n")
+        try:
+            subprocess.run([ffmpeg_path, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                            "-i", list_file.name, "-c", "copy", output_path], check=True)
+            return
+        except subprocess.CalledProcessError:
+            logger.warning("ffmpeg concat failed, falling back to re-encoding with OpenCV.")
+        finally:
+            os.remove(list_file.name)
+
+    out = None
+    for input_path in input_paths:
+        cap = cv2.VideoCapture(input_path)
+        if out is None:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            out = cv2.VideoWriter(output_path, fourcc, cap.get(cv2.CAP_PROP_FPS), (int(cap.get(3)), int(cap.get(4))))
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            out.write(frame)
+        cap.release()
+
+    if out is not None:
+        out.release()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The engine modules are flat scripts in src/, imported by bare name like the CLI does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
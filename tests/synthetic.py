@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+
+# Frame size of the synthetic clips; small, so the dense optical flow stays fast
+FRAME_SIZE = (320, 240)
+
+def textured_frames(offsets, frame_size=FRAME_SIZE, noise=2.0, seed=0):
+    """
+    Frames of a camera panning over a textured scene.
+
+    Args:
+        offsets (Iterable): (dx, dy) camera position of every frame, in pixels (at most 32).
+        frame_size (tuple): (width, height) of the frames.
+        noise (float): Standard deviation of the sensor noise added to every frame.
+        seed (int): Seed of the scene texture and of the noise.
+
+    Returns:
+        numpy.ndarray: (N, H, W, 3) uint8 BGR frames.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = frame_size
+    margin = 32
+    scene = rng.integers(0, 256, (height + 2 * margin, width + 2 * margin, 3), dtype=np.uint8)
+    scene = cv2.normalize(cv2.GaussianBlur(scene, (0, 0), 3), None, 0, 255, cv2.NORM_MINMAX)
+
+    frames = []
+    for dx, dy in offsets:
+        x, y = margin + int(dx), margin + int(dy)
+        frame = scene[y:y + height, x:x + width].astype(np.float32)
+        frame += rng.normal(0, noise, frame.shape)
+        frames.append(np.clip(frame, 0, 255).astype(np.uint8))
+    return np.stack(frames)
+
+def scene_clip(scene_lengths, frame_size=FRAME_SIZE, seed=0):
+    """
+    Frames of a clip made of distinct static scenes, each with its own brightness and texture.
+
+    Args:
+        scene_lengths (list): Number of frames of every scene.
+        frame_size (tuple): (width, height) of the frames.
+        seed (int): Seed of the scene textures.
+
+    Returns:
+        tuple: (frames, cuts): (N, H, W, 3) uint8 BGR frames and the first frame of every scene but the first.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = frame_size
+    frames, cuts = [], []
+    for i, length in enumerate(scene_lengths):
+        if i:
+            cuts.append(sum(scene_lengths[:i]))
+        scene = rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8)
+        scene = cv2.resize(scene, frame_size, interpolation=cv2.INTER_LINEAR)
+        frames.extend([scene] * length)
+    return np.stack(frames), cuts
+
+def write_video(path, frames, fps=30.0):
+    """
+    Encode frames to an mp4v video.
+
+    Args:
+        path (str): Output path (.mp4).
+        frames (numpy.ndarray): (N, H, W, 3) uint8 BGR frames.
+        fps (float): Frame rate.
+
+    Returns:
+        str: `path`.
+    """
+    height, width = frames.shape[1:3]
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for frame in frames:
+        out.write(frame)
+    out.release()
+    return path
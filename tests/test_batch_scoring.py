@@ -0,0 +1,108 @@
+import cv2
+import numpy as np
+import pytest
+
+from batch_scoring import apply_thresholds, score_batch, score_batches, score_video
+from pipeline import pipelined_score_video
+from synthetic import textured_frames, write_video
+
+# Every filter on, with thresholds the test clip crosses both ways
+SETTINGS = {
+    "quality_bool": True, "quality_threshold": 60,
+    "brightness_bool": True, "brightness_threshold": 60,
+    "motion_bool": True, "motion_threshold": 3000,
+    "noise_bool": True, "noise_threshold": 4,
+}
+
+def steady_then_shaky(num_frames=96, seed=0):
+    """Camera offsets of a steady shot followed by a hand-held one jumping several pixels per frame."""
+    rng = np.random.default_rng(seed)
+    steady = np.zeros((num_frames // 2, 2))
+    shaky = rng.integers(-6, 7, (num_frames - num_frames // 2, 2))
+    return np.concatenate([steady, shaky])
+
+def filtered_clip(num_frames=96):
+    """Steady-then-shaky clip with a dark stretch and a noisy stretch."""
+    frames = textured_frames(steady_then_shaky(num_frames))
+    frames[20:30] //= 4
+    rng = np.random.default_rng(1)
+    noisy = frames[60:70].astype(np.float32) + rng.normal(0, 25, frames[60:70].shape)
+    frames[60:70] = np.clip(noisy, 0, 255).astype(np.uint8)
+    return frames
+
+def serial_metrics(frames):
+    """Per-frame metrics with the formulas of the original frame-by-frame loop."""
+    metrics = {name: np.zeros(len(frames)) for name in ("quality", "brightness", "motion", "noise")}
+    prev_gray = None
+    for i, frame in enumerate(frames):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        metrics["quality"][i] = cv2.mean(frame)[0]
+        metrics["brightness"][i] = cv2.mean(gray)[0]
+        if prev_gray is not None:
+            flow = cv2.calcOpticalFlowFarneback(prev_gray, gray, None, 0.5, 3, 15, 3, 5, 1.2, 0)
+            metrics["motion"][i] = cv2.norm(flow, cv2.NORM_L2)
+        metrics["noise"][i] = cv2.mean(cv2.absdiff(frame, cv2.GaussianBlur(frame, (5, 5), 0)))[0]
+        prev_gray = gray
+    return metrics
+
+def split(frames, batch_size=16):
+    return [frames[i:i + batch_size] for i in range(0, len(frames), batch_size)]
+
+def motion(frames, scale):
+    settings = {"quality_bool": False, "motion_bool": True, "motion_threshold": 0, "analysis_scale": scale}
+    motion_state, values = None, []
+    for batch in split(frames):
+        metrics, motion_state = score_batch(batch, settings, motion_state)
+        values.append(metrics["motion"])
+    return np.concatenate(values)
+
+def keep_mask(frames, settings):
+    return np.concatenate([keep for _, keep, _, _ in score_batches(split(frames), settings)])
+
+@pytest.mark.parametrize("scale", [0.5, 0.25])
+def test_proxy_motion_keeps_threshold_meaning(scale):
+    frames = textured_frames(steady_then_shaky())
+    full = motion(frames, 1.0)
+    proxy = motion(frames, scale)
+
+    # Same units as at full resolution, in both the steady and the shaky shot
+    assert np.median(proxy[1:48]) == pytest.approx(np.median(full[1:48]), rel=0.25)
+    assert np.median(proxy[48:]) == pytest.approx(np.median(full[48:]), rel=0.25)
+
+    # A threshold between the two shots keeps the same frames at every scale
+    threshold = np.sqrt(np.median(full[1:48]) * np.median(full[48:]))
+    settings = {"quality_bool": False, "motion_bool": True, "motion_threshold": threshold}
+    keep_full = keep_mask(frames, dict(settings, analysis_scale=1.0))
+    keep_proxy = keep_mask(frames, dict(settings, analysis_scale=scale))
+    assert 40 <= keep_full.sum() <= 56
+    assert (keep_proxy == keep_full).mean() >= 0.95
+
+def test_batch_scoring_matches_serial_formulas():
+    frames = filtered_clip()
+    expected = serial_metrics(frames)
+
+    motion_state, batches = None, []
+    for batch in split(frames):
+        metrics, motion_state = score_batch(batch, SETTINGS, motion_state)
+        batches.append(metrics)
+    for name, values in expected.items():
+        assert np.allclose(np.concatenate([metrics[name] for metrics in batches]), values, rtol=1e-9), name
+
+    _, expected_reasons = apply_thresholds(expected, SETTINGS)
+    reasons = np.concatenate([reasons for _, _, reasons, _ in score_batches(split(frames), SETTINGS)])
+    assert (reasons == expected_reasons).all()
+    # Every filter drops something, and something is kept
+    assert 0 < (reasons == 0).sum() < len(reasons)
+    assert all((reasons & flag).any() for flag in (1, 2, 4, 8))
+
+def test_pipelined_scoring_matches_serial(tmp_path):
+    video_path = write_video(str(tmp_path / "clip.mp4"), filtered_clip())
+
+    def reasons(score):
+        cap = cv2.VideoCapture(video_path)
+        try:
+            return np.concatenate([reasons for _, _, reasons, _ in score(cap, SETTINGS, 16)])
+        finally:
+            cap.release()
+
+    assert (reasons(pipelined_score_video) == reasons(score_video)).all()
@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+
+from edit_decision_list import SEEK_THRESHOLD, EditDecisionList, EdlReader, open_video
+from scene_detection import detect_scenes_native
+from synthetic import scene_clip, write_video
+
+def decode(cap):
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return np.stack(frames)
+
+def keep_mask(num_frames):
+    """Short and long gaps, the long one beyond the seek threshold."""
+    keep = np.ones(num_frames, dtype=bool)
+    keep[5:9] = False
+    keep[30:31] = False
+    keep[60:60 + SEEK_THRESHOLD + 20] = False
+    keep[-3:] = False
+    return keep
+
+def test_reader_returns_the_kept_source_frames(tmp_path):
+    # Every frame looks different, so a frame off by one can't pass
+    frames, _ = scene_clip([1] * 260, frame_size=(160, 120))
+    video_path = write_video(str(tmp_path / "clip.mp4"), frames)
+    source = decode(cv2.VideoCapture(video_path))
+    keep = keep_mask(len(source))
+
+    edl = EditDecisionList.from_keep_mask(video_path, 30.0, keep)
+    assert edl.num_frames == keep.sum()
+    assert [edl.to_source(i) for i in range(edl.num_frames)] == np.flatnonzero(keep).tolist()
+
+    edl_path = str(tmp_path / "clip.edl.json")
+    edl.save(edl_path)
+    reader = open_video(edl_path)
+    assert isinstance(reader, EdlReader)
+    assert (decode(reader) == source[keep]).all()
+
+    # Seeking lands on the same frames, forwards and backwards
+    reader = EdlReader(edl)
+    for virtual_index in [edl.num_frames - 1, 58, 62, 0, 40]:
+        reader.set(cv2.CAP_PROP_POS_FRAMES, virtual_index)
+        ret, frame = reader.read()
+        assert ret and (frame == source[edl.to_source(virtual_index)]).all()
+    reader.release()
+
+def test_scenes_on_the_list_match_the_rendered_video(tmp_path):
+    frames, _ = scene_clip([40, 70, 200, 50])
+    video_path = write_video(str(tmp_path / "clip.mp4"), frames)
+    keep = keep_mask(len(frames))
+
+    # Same frame numbers whether the kept frames are read through the list or re-encoded
+    rendered_path = write_video(str(tmp_path / "rendered.mp4"), decode(cv2.VideoCapture(video_path))[keep])
+    edl = EditDecisionList.from_keep_mask(video_path, 30.0, keep)
+    from_edl = detect_scenes_native(EdlReader(edl))
+    from_rendered = detect_scenes_native(cv2.VideoCapture(rendered_path))
+    assert len(from_edl) > 1
+    assert [(start.get_frames(), end.get_frames()) for start, end in from_edl] == \
+           [(start.get_frames(), end.get_frames()) for start, end in from_rendered]
@@ -0,0 +1,31 @@
+import time
+import numpy as np
+import pytest
+
+from batch_scoring import REASON_DARK, describe_reasons
+from exclusion_log import ExclusionLog
+
+@pytest.mark.parametrize("fps", [29.97, 23.976, 30000 / 1001])
+def test_reasons_at_exact_run_boundaries(fps):
+    # Alternating one-frame runs, so every frame starts a run or a kept gap
+    reasons = np.zeros(20000, dtype=np.uint8)
+    reasons[1::2] = REASON_DARK
+    log = ExclusionLog.from_reasons(reasons, fps)
+
+    frames = np.arange(len(reasons))
+    found = [log.reasons_at(frame / fps) for frame in frames.tolist()]
+    assert found == [describe_reasons(mask) for mask in reasons]
+    # Any time while a frame is shown maps to that frame
+    assert [log.reasons_at((frame + 0.5) / fps) for frame in frames.tolist()] == found
+
+def test_reasons_at_is_a_binary_search_on_a_large_log():
+    # Two million runs: rebuilding the run times on every call would take seconds here
+    reasons = np.zeros(4_000_000, dtype=np.uint8)
+    reasons[1::2] = REASON_DARK
+    log = ExclusionLog.from_reasons(reasons, 29.97)
+
+    frames = np.linspace(0, len(reasons) - 1, 2000).astype(np.int64)
+    started = time.perf_counter()
+    found = [log.reasons_at(frame / 29.97) for frame in frames.tolist()]
+    assert time.perf_counter() - started < 1.0
+    assert found == [describe_reasons(reasons[frame]) for frame in frames.tolist()]
@@ -0,0 +1,40 @@
+import os
+
+import cv2
+import numpy as np
+
+from generate_shorts import export_clips
+from parallel_clip_export import export_clips_parallel
+from synthetic import scene_clip, write_video
+
+def decode(video_path):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return np.stack(frames)
+
+def test_parallel_export_matches_serial(tmp_path):
+    lengths = [30, 45, 12, 60, 25]
+    frames, cuts = scene_clip(lengths)
+    video_path = write_video(str(tmp_path / "clip.mp4"), frames)
+    bounds = [0] + cuts + [len(frames)]
+    scenes = list(zip(bounds[:-1], bounds[1:]))
+
+    serial_dir, parallel_dir = str(tmp_path / "serial"), str(tmp_path / "parallel")
+    os.makedirs(serial_dir)
+    os.makedirs(parallel_dir)
+    cap = cv2.VideoCapture(video_path)
+    serial = list(export_clips(cap, scenes, serial_dir, 30.0))
+    cap.release()
+    parallel = export_clips_parallel(video_path, scenes, parallel_dir, 30.0, (320, 240), workers=2)
+
+    assert [os.path.basename(path) for path in parallel] == [os.path.basename(path) for path in serial]
+    for serial_path, parallel_path, length in zip(serial, parallel, lengths):
+        serial_frames = decode(serial_path)
+        assert len(serial_frames) == length
+        assert (decode(parallel_path) == serial_frames).all()
@@ -0,0 +1,58 @@
+import cv2
+import numpy as np
+import pytest
+
+from batch_scoring import read_batches, score_batch, score_video
+from parallel_preprocessing import preprocess_parallel, split_ranges
+from synthetic import textured_frames, write_video
+
+SETTINGS = {"quality_bool": True, "quality_threshold": 60, "motion_bool": True, "motion_method": "sparse", "shake_threshold": 5}
+
+def frame_count(video_path):
+    cap = cv2.VideoCapture(video_path)
+    count = 0
+    while cap.grab():
+        count += 1
+    cap.release()
+    return count
+
+def test_parallel_matches_serial(tmp_path):
+    # Shaky stretches across the chunk boundaries, and dark frames to drop
+    rng = np.random.default_rng(0)
+    offsets = rng.integers(-6, 7, (120, 2)) * (np.arange(120) % 40 > 25)[:, np.newaxis]
+    frames = textured_frames(offsets)
+    frames[50:58] //= 4
+    video_path = write_video(str(tmp_path / "clip.mp4"), frames)
+
+    cap = cv2.VideoCapture(video_path)
+    serial = np.concatenate([reasons for _, _, reasons, _ in score_video(cap, SETTINGS, 8)])
+    cap.release()
+    assert (serial & 1).any() and (serial & 4).any() and (serial == 0).any()
+
+    output_path = str(tmp_path / "out.mp4")
+    parallel = preprocess_parallel(video_path, output_path, SETTINGS, workers=2, batch_size=8)
+    assert (parallel == serial).all()
+    assert frame_count(output_path) == (serial == 0).sum()
+
+@pytest.mark.parametrize("quantile", [0.25, 0.5, 0.75])
+def test_parallel_matches_serial_on_a_proxy(tmp_path, quantile):
+    # A pan with uneven speed, so the dense motion of the proxy is calibrated per batch
+    rng = np.random.default_rng(2)
+    offsets = np.cumsum(rng.integers(0, 3, (160, 2)), axis=0) % 48 - 24
+    video_path = write_video(str(tmp_path / "clip.mp4"), textured_frames(offsets))
+    settings = {"quality_bool": False, "motion_bool": True, "motion_method": "dense", "analysis_scale": 0.5}
+
+    cap = cv2.VideoCapture(video_path)
+    motion = np.concatenate([score_batch(frames, settings)[0]["motion"] for frames in read_batches(cap, 16)])
+    cap.release()
+    settings["motion_threshold"] = float(np.quantile(motion, quantile))
+
+    cap = cv2.VideoCapture(video_path)
+    serial = np.concatenate([reasons for _, _, reasons, _ in score_video(cap, settings, 16)])
+    cap.release()
+    assert (serial == 0).any() and (serial != 0).any()
+
+    # Chunks start at odd frame counts without the batch alignment: 160 frames in 8 chunks of 20
+    assert all(start % 16 == 0 for start, _ in split_ranges(160, 8, 16))
+    parallel = preprocess_parallel(video_path, None, settings, workers=2, batch_size=16)
+    assert (parallel == serial).all()
@@ -0,0 +1,58 @@
+import cv2
+import pytest
+from scenedetect import SceneManager, VideoManager
+from scenedetect.detectors import ContentDetector
+
+from parallel_scene_detection import detect_scenes_parallel
+from scene_detection import detect_scenes, detect_scenes_coarse_to_fine, detect_scenes_native
+from synthetic import scene_clip, write_video
+
+def cuts(scene_list):
+    return [start.get_frames() for start, _ in scene_list[1:]]
+
+def detect(detect_fn, video_path, **kwargs):
+    cap = cv2.VideoCapture(video_path)
+    try:
+        return cuts(detect_fn(cap, **kwargs))
+    finally:
+        cap.release()
+
+@pytest.fixture
+def clip(tmp_path):
+    # A 1-frame scene, too short for the coarse samples to see on their own
+    frames, scene_cuts = scene_clip([37, 1, 40, 50, 33])
+    return write_video(str(tmp_path / "clip.mp4"), frames), scene_cuts
+
+def test_native_finds_every_cut(clip):
+    video_path, scene_cuts = clip
+    # The cut after the 1-frame scene is within min_scene_len of the one before it
+    assert detect(detect_scenes_native, video_path, min_scene_len=15) == [scene_cuts[0]] + scene_cuts[2:]
+
+def pyscenedetect_cuts(video_path, threshold=27.0, min_scene_len=15):
+    """Cuts of the original VideoManager + ContentDetector path of timeline.py."""
+    video_manager = VideoManager([video_path])
+    scene_manager = SceneManager()
+    scene_manager.add_detector(ContentDetector(threshold, min_scene_len))
+    video_manager.set_downscale_factor()
+    video_manager.start()
+    scene_manager.detect_scenes(frame_source=video_manager)
+    scene_list = scene_manager.get_scene_list()
+    video_manager.release()
+    return cuts(scene_list)
+
+def test_native_matches_pyscenedetect(clip):
+    video_path, _ = clip
+    expected = pyscenedetect_cuts(video_path)
+    assert detect(detect_scenes_native, video_path) == expected
+    assert detect(detect_scenes, video_path, detector=ContentDetector(27.0, 15)) == expected
+    assert cuts(detect_scenes_parallel(video_path, 27.0, 15, 2, 16)) == expected
+
+def test_coarse_refining_every_window_is_exact(clip):
+    video_path, _ = clip
+    native = detect(detect_scenes_native, video_path, min_scene_len=15)
+    assert detect(detect_scenes_coarse_to_fine, video_path, min_scene_len=15, coarse_step=8, candidate_ratio=0) == native
+
+def test_coarse_finds_cuts_between_long_scenes(tmp_path):
+    frames, scene_cuts = scene_clip([45, 60, 38, 50])
+    video_path = write_video(str(tmp_path / "clip.mp4"), frames)
+    assert detect(detect_scenes_coarse_to_fine, video_path, min_scene_len=15, coarse_step=8) == scene_cuts
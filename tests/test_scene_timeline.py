@@ -0,0 +1,29 @@
+import time
+import numpy as np
+import pytest
+
+from scene_timeline import Timeline
+
+@pytest.mark.parametrize("fps", [29.97, 23.976, 30000 / 1001])
+def test_scene_at_exact_scene_boundaries(fps):
+    # Scenes of 1 to 4 frames, so boundaries fall on many different frame numbers
+    lengths = np.tile([1, 2, 3, 4], 2000)
+    ends = np.cumsum(lengths)
+    timeline = Timeline(fps, ends - lengths, ends)
+
+    for scene, (start, end) in enumerate(timeline):
+        assert timeline.scene_at(start / fps) == scene
+        assert timeline.scene_at((end - 0.5) / fps) == scene
+    assert timeline.scene_at(ends[-1] / fps) == -1
+    assert timeline.scene_at(-0.5 / fps) == -1
+
+def test_scene_at_is_a_binary_search_on_a_large_timeline():
+    # Two million scenes: rebuilding the scene times on every call would take seconds here
+    ends = np.arange(1, 2_000_001) * 2
+    timeline = Timeline(29.97, ends - 2, ends)
+
+    frames = np.linspace(0, ends[-1] - 1, 2000).astype(np.int64)
+    started = time.perf_counter()
+    found = [timeline.scene_at(frame / 29.97) for frame in frames.tolist()]
+    assert time.perf_counter() - started < 1.0
+    assert found == (frames // 2).tolist()
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import stabilization
+from batch_scoring import batch_gray, score_batches
+from stabilization import Stabilizer, batch_transforms, smooth_trajectory
+from synthetic import textured_frames
+
+def split(values, batch_size=16):
+    return [values[i:i + batch_size] for i in range(0, len(values), batch_size)]
+
+def corrections(transforms, keep_mask, radius, monkeypatch):
+    """Offsets the Stabilizer warps the kept frames by, fed batch by batch."""
+    monkeypatch.setattr(stabilization, "warp_frame", lambda frame, correction: correction)
+    frames = np.zeros(len(transforms))
+    stabilizer = Stabilizer(radius)
+    applied = []
+    for batch in zip(split(frames), split(keep_mask), split(transforms)):
+        applied.extend(stabilizer.add_batch(*batch))
+    applied.extend(stabilizer.flush())
+    return np.array(applied)
+
+@pytest.mark.parametrize("keep_every", [1, 3])
+def test_streaming_matches_smooth_trajectory(keep_every, monkeypatch):
+    rng = np.random.default_rng(0)
+    transforms = rng.normal(0, [3, 3, 0.01], (100, 3))
+    keep_mask = np.arange(100) % keep_every == 0
+
+    # Reference: the whole trajectory of the kept frames, smoothed at once
+    trajectory = np.cumsum(transforms, axis=0)[keep_mask]
+    kept_transforms = np.diff(trajectory, axis=0, prepend=np.zeros((1, 3)))
+    expected = smooth_trajectory(kept_transforms, 5) - kept_transforms
+
+    applied = corrections(transforms, keep_mask, 5, monkeypatch)
+    assert applied.shape == expected.shape
+    assert np.allclose(applied, expected)
+
+def test_stabilized_output_is_steadier():
+    rng = np.random.default_rng(1)
+    offsets = np.cumsum(rng.integers(-3, 4, (64, 2)), axis=0).clip(-24, 24)
+    frames = textured_frames(offsets)
+    settings = {"quality_bool": False, "stabilize_bool": True}
+
+    stabilizer = Stabilizer(8)
+    output = []
+    for batch, keep_mask, _, transforms in score_batches(split(frames), settings):
+        output.extend(stabilizer.add_batch(batch, keep_mask, transforms))
+    output.extend(stabilizer.flush())
+    assert len(output) == len(frames)
+
+    # Away from the edges, the camera moves much less from frame to frame
+    before = batch_transforms(batch_gray(frames))[16:-16, :2]
+    after = batch_transforms(batch_gray(np.stack(output)))[16:-16, :2]
+    assert np.abs(after).mean() < 0.5 * np.abs(before).mean()
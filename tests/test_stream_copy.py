@@ -0,0 +1,79 @@
+import subprocess
+
+import cv2
+import numpy as np
+import pytest
+
+from stream_copy import ENCODERS, export_clip_stream_copy, keyframe_times, stream_copy_segments, stream_parameters
+from synthetic import scene_clip, write_video
+from video_io import find_ffmpeg
+
+FFMPEG = find_ffmpeg()
+GOP = 10
+
+def decode(video_path):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame.astype(np.int16))
+    cap.release()
+    return np.stack(frames)
+
+def test_keyframe_at_the_clip_end_closes_a_gop():
+    keyframes = np.arange(0, 60, GOP)
+    assert stream_copy_segments(10, 40, keyframes) == [(10, 40, True)]
+    assert stream_copy_segments(5, 37, keyframes) == [(5, 10, False), (10, 30, True), (30, 37, False)]
+    # The end of the stream closes the last GOP
+    assert stream_copy_segments(50, 60, keyframes, 60) == [(50, 60, True)]
+    assert stream_copy_segments(50, 60, keyframes) == [(50, 60, False)]
+
+@pytest.mark.skipif(FFMPEG is None, reason="needs ffmpeg")
+def test_clips_are_frame_accurate(tmp_path):
+    # Every frame looks different, so a clip off by one frame can't pass
+    frames, _ = scene_clip([1] * 60, frame_size=(160, 128))
+    raw_path = write_video(str(tmp_path / "raw.mp4"), frames)
+    video_path = str(tmp_path / "source.mp4")
+    subprocess.run([FFMPEG, "-y", "-loglevel", "error", "-i", raw_path, "-c:v", "libx264", "-pix_fmt", "yuv420p",
+                    "-g", str(GOP), "-keyint_min", str(GOP), "-sc_threshold", "0", "-bf", "0", video_path], check=True)
+    source = decode(video_path)
+    parameters = stream_parameters(FFMPEG, video_path)
+    times = keyframe_times(FFMPEG, video_path)
+    keyframes = np.round((times - times[0]) * 30).astype(np.int64)
+    assert keyframes.tolist() == list(range(0, 60, GOP))
+
+    for start_frame, end_frame, copied in [(10, 40, 30), (5, 37, 20), (50, 60, 10), (3, 8, 0)]:
+        clip_path = str(tmp_path / f"clip_{start_frame}.mp4")
+        assert export_clip_stream_copy(FFMPEG, video_path, start_frame, end_frame, clip_path, 30.0, keyframes,
+                                       ENCODERS[parameters["codec_name"]], parameters, len(source)) == copied
+        clip = decode(clip_path)
+        assert len(clip) == end_frame - start_frame
+        # Every clip frame is closest to the source frame it should be; copied GOPs are bit-exact
+        distances = np.abs(clip[:, np.newaxis] - source[np.newaxis]).mean(axis=(2, 3, 4))
+        assert distances.argmin(axis=1).tolist() == list(range(start_frame, end_frame))
+        for segment_start, segment_end, copy in stream_copy_segments(start_frame, end_frame, keyframes, len(source)):
+            if copy:
+                assert (clip[segment_start - start_frame:segment_end - start_frame] == source[segment_start:segment_end]).all()
+        assert stream_parameters(FFMPEG, clip_path)["profile"] == parameters["profile"]
+
+@pytest.mark.skipif(FFMPEG is None, reason="needs ffmpeg")
+def test_clip_is_reencoded_whole_when_segments_cant_match(tmp_path):
+    frames, _ = scene_clip([1] * 40, frame_size=(160, 128))
+    raw_path = write_video(str(tmp_path / "raw.mp4"), frames)
+    video_path = str(tmp_path / "source.mp4")
+    subprocess.run([FFMPEG, "-y", "-loglevel", "error", "-i", raw_path, "-c:v", "libx264", "-pix_fmt", "yuv420p",
+                    "-g", str(GOP), "-sc_threshold", "0", "-bf", "0", video_path], check=True)
+    source = decode(video_path)
+    parameters = stream_parameters(FFMPEG, video_path)
+    keyframes = np.arange(0, 40, GOP)
+
+    # A profile without an encoder name: the segments come out as High and get re-encoded whole
+    clip_path = str(tmp_path / "clip.mp4")
+    assert export_clip_stream_copy(FFMPEG, video_path, 5, 37, clip_path, 30.0, keyframes, "libx264",
+                                   dict(parameters, profile="High 4:4:4 Intra"), len(source)) == 0
+    clip = decode(clip_path)
+    assert len(clip) == 32
+    distances = np.abs(clip[:, np.newaxis] - source[np.newaxis]).mean(axis=(2, 3, 4))
+    assert distances.argmin(axis=1).tolist() == list(range(5, 37))